@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the utils modules import each other by name, like when they are run from the utils folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utils'))
@@ -0,0 +1,44 @@
+import json
+import time
+from price_book import PriceBookService, ReplayTransport
+
+
+class PartialStreamTransport:
+    reconnect = True
+
+    def __init__(self):
+        self.closed = False
+
+    def snapshot(self):
+        return [('ETHBTC', 0.025), ('XVGBTC', 0.0000002)]
+
+    def messages(self):
+        # only the liquid market changes after the connect
+        yield [('ETHBTC', 0.026)]
+        while not self.closed:
+            time.sleep(0.01)
+
+    def close(self):
+        self.closed = True
+
+
+def test_book_is_seeded_with_every_market():
+    service = PriceBookService(PartialStreamTransport(), reconnect_delay=0.01).start()
+    service.thread.join(0.2)
+    service.stop()
+    service.thread.join(1)
+
+    assert service.price_book.seeded
+    assert service.price_book.get_prices() == {'ETHBTC': 0.026, 'XVGBTC': 0.0000002}
+
+
+def test_replay_without_loop_stops_the_service(tmp_path):
+    replay_path = tmp_path / 'replay.jsonl'
+    replay_path.write_text(json.dumps([{'s': 'ETHBTC', 'c': '0.025'}]) + '\n')
+
+    service = PriceBookService(ReplayTransport(str(replay_path)), reconnect_delay=0.01).start()
+    service.thread.join(1)
+
+    assert not service.thread.is_alive()
+    assert service.stopped.is_set()
+    assert service.price_book.get('ETHBTC') == 0.025
@@ -0,0 +1,59 @@
+from trade_harvester import TradeStore
+
+
+def make_trade(trade_id, close_date, **values):
+    trade = {
+        'id': trade_id,
+        'pair': 'ETH/BTC',
+        'is_open': 0,
+        'close_profit': 0.01,
+        'stake_amount': 0.05,
+        'close_profit_abs': None,
+        'sell_order_status': None,
+        'open_date': '2020-06-01 10:00:00',
+        'close_date': close_date,
+        'strategy': 'Strategy001'
+    }
+    trade.update(values)
+    return trade
+
+
+def test_batches_with_different_null_columns_read_back(tmp_path):
+    store = TradeStore(str(tmp_path))
+
+    # the first batch has only nulls where the later ones have values
+    store.append('bot-1', 'tradesv3.sqlite', False, [make_trade(1, '2020-06-01 12:00:00')])
+    store.append('bot-1', 'tradesv3.sqlite', False, [
+        make_trade(2, '2020-06-01 13:00:00', sell_order_status='closed', close_profit_abs=0.002),
+        make_trade(3, '2020-06-02 09:00:00', sell_order_status='closed', fee_open_currency='BTC')
+    ])
+    store.append('bot-2', 'tradesv3.sqlite', False, [make_trade(1, '2020-06-02 10:00:00', extra_column=[1])])
+
+    trades = store.load()
+    assert len(trades) == 4
+    assert sorted(trades['sell_order_status'].dropna()) == ['closed', 'closed']
+
+    profit = store.profit_per_strategy_per_day()
+    assert profit.loc[('Strategy001', '2020-06-01'), 'count'] == 2
+    assert abs(profit.loc[('Strategy001', '2020-06-01'), 'sum'] - 0.0025) < 1e-9
+    assert profit.loc[('Strategy001', '2020-06-02'), 'count'] == 2
+
+
+def test_null_profit_is_computed_from_ratio(tmp_path):
+    store = TradeStore(str(tmp_path))
+    store.append('bot-1', 'tradesv3.sqlite', False, [make_trade(1, '2020-06-01 12:00:00')])
+
+    assert abs(store.load()['close_profit_abs'][0] - 0.0005) < 1e-9
+
+
+def test_dry_run_trades_are_kept_apart(tmp_path):
+    store = TradeStore(str(tmp_path))
+    store.append('bot-1', 'tradesv3.dryrun.sqlite', True, [make_trade(1, '2020-06-05 12:00:00')])
+    store.append('bot-1', 'tradesv3.sqlite', False, [make_trade(1, '2020-06-01 12:00:00')])
+
+    # switching to live does not skip live trades older than the dry run ones
+    assert store.get_watermark('bot-1', 'tradesv3.dryrun.sqlite') == '2020-06-05 12:00:00'
+    assert store.get_watermark('bot-1', 'tradesv3.sqlite') == '2020-06-01 12:00:00'
+
+    assert list(store.profit_per_strategy_per_day().index) == [('Strategy001', '2020-06-01')]
+    assert list(store.profit_per_strategy_per_day(dry_run=True).index) == [('Strategy001', '2020-06-05')]
@@ -0,0 +1,106 @@
+import time
+import queue
+import logging
+import telegram
+import threading
+from collections import OrderedDict
+
+
+class AlertDispatcher:
+    def __init__(self, alert_bot, chat_id, window=10, max_queue_size=500):
+        self.alert_bot = alert_bot
+        self.chat_id = chat_id
+        self.window = window
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.pending = OrderedDict()
+        self.counters = {'queued': 0, 'dropped': 0, 'merged': 0, 'sent': 0, 'failed': 0}
+        self.counters_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.run, name='alert-dispatcher', daemon=True)
+        self.thread.start()
+
+    def count(self, counter):
+        with self.counters_lock:
+            self.counters[counter] += 1
+
+    def get_counters(self):
+        with self.counters_lock:
+            return dict(self.counters)
+
+    def report(self, name, message):
+        # never block the caller, drop the alert if the queue is full
+        try:
+            self.queue.put_nowait((name, message, time.monotonic()))
+            self.count('queued')
+        except queue.Full:
+            self.count('dropped')
+
+    def add(self, name, message, reported_at):
+        group = self.pending.get(name)
+        if not group:
+            self.pending[name] = {'started_at': reported_at, 'messages': OrderedDict([(message, 1)])}
+            return
+
+        # fold the alert into the open group of this bot and count repeats of the same error
+        group['messages'][message] = group['messages'].get(message, 0) + 1
+        self.count('merged')
+
+    def format(self, name, messages):
+        lines = []
+        for message, count in messages.items():
+            if count > 1:
+                lines.append(f'{message} (x{count})')
+            else:
+                lines.append(message)
+
+        return f'{name} Error:\n' + '\n'.join(lines)
+
+    def send(self, name, group):
+        try:
+            self.alert_bot.send_message(chat_id=self.chat_id, text=self.format(name, group['messages']))
+            self.count('sent')
+        except Exception as error:
+            logging.error(f'failed to send alert for {name}: {error}')
+            self.count('failed')
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        for name in list(self.pending.keys()):
+            if force or now - self.pending[name]['started_at'] >= self.window:
+                self.send(name, self.pending.pop(name))
+
+    def run(self):
+        while not (self.stopped.is_set() and self.queue.empty()):
+            try:
+                self.add(*self.queue.get(timeout=0.5))
+            except queue.Empty:
+                pass
+
+            self.flush()
+
+        self.flush(force=True)
+
+    def close(self, timeout=30):
+        # send whatever is still waiting before the process exits
+        self.stopped.set()
+        self.thread.join(timeout)
+
+
+alert_dispatchers = {}
+alert_dispatchers_lock = threading.Lock()
+
+
+def get_alert_dispatcher(telegram_token, chat_id):
+    # every bot reporting to the same alert chat shares one queue
+    with alert_dispatchers_lock:
+        key = (telegram_token, chat_id)
+        if key not in alert_dispatchers:
+            alert_dispatchers[key] = AlertDispatcher(telegram.Bot(token=telegram_token), chat_id)
+        return alert_dispatchers[key]
+
+
+def close_alert_dispatchers():
+    for alert_dispatcher in list(alert_dispatchers.values()):
+        alert_dispatcher.close()
+        logging.debug(f'alert counters {alert_dispatcher.get_counters()}')
@@ -0,0 +1,65 @@
+import requests
+import rapidjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tracing import tracer
+
+
+class BotApiClient:
+    summary_commands = ['status', 'profit', 'balance', 'count']
+
+    def __init__(self, host_name, username, password, port=8080, timeout=5, retries=2, name=None):
+        self.host_name = host_name
+        self.name = name
+        self.base_url = f'http://{host_name}:{port}/api/v1'
+        self.timeout = timeout
+
+        # retry dropped connections and gateway errors, but never re-send a request the bot already answered
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False
+        )
+
+        # keep the connection to the bot alive between calls
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+
+    def decode(self, response):
+        response.raise_for_status()
+
+        # parse the raw bytes directly rather than building the text first
+        return rapidjson.loads(response.content)
+
+    def request(self, method, command, **kwargs):
+        with tracer.span(f'{method} {command}', 'api', self.name, self.host_name) as span:
+            response = self.session.request(method, f'{self.base_url}/{command}', timeout=self.timeout, **kwargs)
+
+            # record the bytes received and the retries urllib3 made along the way
+            span.add_bytes(len(response.content))
+            retries = getattr(response.raw, 'retries', None)
+            if retries:
+                span.retries = len(retries.history)
+
+            return self.decode(response)
+
+    def get(self, command, params=None):
+        return self.request('GET', command, params=params)
+
+    def post(self, command, data=None):
+        return self.request('POST', command, json=data)
+
+    def get_summary(self, commands=None):
+        # fetch everything over the same kept alive connection
+        summary = {}
+        for command in commands or self.summary_commands:
+            summary[command] = self.get(command)
+
+        return summary
+
+    def close(self):
+        self.session.close()
@@ -1,14 +1,30 @@
-import time
-import json
 import math
-import ccxt
+import time
 import logging
 import paramiko
 import requests
 import rapidjson
 import datetime
-import telegram
-import threading
+from functools import cached_property
+from ssh_pool import ssh_pool
+from sftp_sync import SFTPSync, default_manifest_path
+from readiness import ReadinessProbe
+from api_client import BotApiClient
+from market_snapshot import MarketSnapshot
+from market_index import get_market_index
+from order_canceler import OrderCanceler
+from liquidator import Liquidator
+from rate_limiter import get_rate_limiter
+from exchange import create_exchange
+from alerts import get_alert_dispatcher
+from config_cache import config_cache
+from pipeline import Stage, Checkpoint, UpdatePipeline
+from tracing import tracer
+from valuation import ValuationEngine
+from remote_command import RemoteCommand
+from fleet_control import FleetControl
+from trade_harvester import TradeHarvester
+from transport import get_command_transport
 
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger('telegram').setLevel(logging.WARNING)
@@ -18,155 +34,229 @@ logging.getLogger('ccxt').setLevel(logging.WARNING)
 
 
 class Bot:
+    # config keys that only take effect when the freqtrade process is restarted
+    restart_config_keys = ['api_server']
+
     def __init__(self, bot_data, bot_alert_data):
         self.name = bot_data['name']
         self.dry_run = bot_data['dry_run']
         self.full_reset = bot_data['full_reset']
+        self.single_round_trip = bot_data.get('single_round_trip', False)
+        self.allow_hot_reload = bot_data.get('hot_reload', True)
         self.initial_state = bot_data['initial_state']
         self.host_name = bot_data['host_name']
         self.user_name = bot_data['user_name']
+        self.transport = bot_data.get('transport', 'ssh')
+        self.instance_id = bot_data.get('instance_id')
+        self.private_key_file = bot_data.get('private_key')
+        self.ready_timeout = bot_data.get('ready_timeout', 300)
+        self.ready_deadline_at = None
         self.config_url = bot_data['config']
         self.config_file = bot_data["config"].rsplit("/", 1)[-1]
-        self.config_values = self.get_config_values()
         self.strategy_url = bot_data['strategy']
         self.strategy_file = bot_data['strategy'].rsplit("/", 1)[-1]
         self.strategy_class = self.strategy_file.replace('.py', '')
+        self.log_file = 'user_data/logs/freqtrade.log'
         self.exchange_key = bot_data['exchange_key']
         self.exchange_secret = bot_data['exchange_secret']
         self.telegram_chat_id = bot_data['telegram_chat_id']
         self.telegram_token = bot_data['telegram_token']
         self.api_server_username = bot_data['api_server_username']
         self.api_server_password = bot_data['api_server_password']
-        self.stake_currency = self.config_values['stake_currency']
-        self.fiat_display_currency = self.config_values['fiat_display_currency']
+        self.market_snapshot_ttl = bot_data.get('market_snapshot_ttl', 10)
+        self.bot_alert_data = bot_alert_data
+        self.ssh_pool = ssh_pool
 
         self.get_current_date = datetime.datetime.now().strftime("%Y-%m-%d")
 
-        if bot_data.get('private_key'):
-            self.private_key = paramiko.RSAKey.from_private_key_file(bot_data['private_key'])
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        # the current update stage and an optional callback to report progress
+        self.stage = None
+        self.stage_callback = None
+
+    # the remote config, ssh key and clients below are only built the first time they are used
+
+    @cached_property
+    def config_values(self):
+        return self.get_config_values()
+
+    @property
+    def stake_currency(self):
+        return self.config_values['stake_currency']
+
+    @property
+    def fiat_display_currency(self):
+        return self.config_values['fiat_display_currency']
+
+    @cached_property
+    def private_key(self):
+        return paramiko.RSAKey.from_private_key_file(self.private_key_file)
 
-        exchange_class = getattr(ccxt, 'binance')
-        self.exchange = exchange_class({
-            'apiKey': self.exchange_key,
-            'secret': self.exchange_secret,
-            'timeout': 30000,
-            'enableRateLimit': True,
-        })
+    @cached_property
+    def command_transport(self):
+        return get_command_transport(self.transport)
 
-        self.alert_bot = telegram.Bot(token=bot_alert_data['telegram_token'])
-        self.alert_bot_telegram_chat_id = bot_alert_data['telegram_chat_id']
+    @cached_property
+    def readiness(self):
+        return ReadinessProbe(self.host_name, deadline=self.ready_timeout)
+
+    @cached_property
+    def api(self):
+        return BotApiClient(self.host_name, self.api_server_username, self.api_server_password, name=self.name)
+
+    @cached_property
+    def exchange(self):
+        # every bot using the same exchange key shares one rate limiter
+        return create_exchange(self.exchange_key, self.exchange_secret)
+
+    @cached_property
+    def rate_limiter(self):
+        return get_rate_limiter(self.exchange_key)
+
+    @cached_property
+    def market_snapshot(self):
+        # prices, balances and markets shared by the balance helpers until they expire or a trade is made
+        return MarketSnapshot(self.exchange, self.rate_limiter, ttl=self.market_snapshot_ttl)
+
+    @cached_property
+    def market_index(self):
+        return get_market_index(self.exchange)
+
+    @cached_property
+    def alert_dispatcher(self):
+        # errors are queued and grouped in the background instead of sent inline
+        return get_alert_dispatcher(self.bot_alert_data['telegram_token'], self.bot_alert_data['telegram_chat_id'])
 
     def get_config_values(self):
-        # get the config text from the config url
-        response = requests.get(self.config_url)
+        # bots sharing a config url share one download
+        return config_cache.get(self.config_url)
 
-        # load in the config as json
-        return rapidjson.loads(
-            response.text,
-            parse_mode=rapidjson.PM_COMMENTS | rapidjson.PM_TRAILING_COMMAS
-        )
+    def trace(self, name, kind='stage'):
+        return tracer.span(name, kind, self.name, self.host_name)
 
     def bash_command(self, command):
-        self.open_connection()
-        bash_input, terminal_output, error = self.client.exec_command(command)
+        # run the command over ssh or ssm depending on the bot's transport
+        result = self.command_transport.run(self, command)
 
-        error_message = error.read().decode("utf-8")
-        output = terminal_output.read().decode("utf-8").split('\n')
+        if result.error:
+            raise RuntimeError(f'{self.name} command failed: {result.error}')
 
-        self.close_connection()
+        if result.stderr:
+            return result.stderr
 
-        if error_message:
-            return error_message
+        return result.stdout.split('\n')
 
-        return output
+    def stream_command(self, command, timeout=None):
+        # iterate over the result to get the stdout and stderr lines as they arrive, then read its exit status
+        return RemoteCommand(self.open_connection(), command, timeout=timeout)
 
     def run_detached_command(self, command):
-        self.open_connection()
-
-        # run the commands in a separate detached channel
-        transport = self.client.get_transport()
-        channel = transport.open_session()
-        channel.exec_command(command)
-        self.close_connection()
+        self.command_transport.run_detached(self, command)
 
     def open_connection(self):
-        self.client.connect(
-            hostname=self.host_name,
-            username=self.user_name,
-            pkey=self.private_key
-        )
+        return self.ssh_pool.open_channel(self.host_name, self.user_name, self.private_key)
 
     def close_connection(self):
-        self.client.close()
+        self.ssh_pool.close(self.host_name, self.user_name)
 
     def reboot_machine(self):
         logging.debug(f'rebooting the {self.name} machine...')
-        self.bash_command('sudo reboot')
+        # check sudo works without a password, then reboot a second later so the command can return first
+        result = self.command_transport.run(
+            self, "sudo -n true && { nohup sh -c 'sleep 1 && sudo -n reboot' > /dev/null 2>&1 & }"
+        )
+        if result.error or result.exit_status != 0:
+            raise RuntimeError(f'{self.name} reboot failed: {result.error or result.stderr}')
 
-    def check_connection(self, fail_count=1):
-        try:
-            if fail_count < 5:
-                # wait 3 seconds before attempting to connect to the remote machine
-                time.sleep(3)
+        # the pooled transport dies with the reboot, so drop it now
+        self.close_connection()
+
+        # wait for the machine to go down so the next connection check sees it come back up
+        result = self.readiness.wait_for_shutdown()
+        if not result.ready:
+            raise RuntimeError(f'{self.name} machine was still up {result.elapsed:.0f}s after the reboot command')
 
-                # try to run a command to test the connection
-                logging.debug(f'attempt {fail_count} to connect to the {self.name} machine...')
+        # coming back up over ssh and starting the api share one deadline
+        self.ready_deadline_at = time.monotonic() + self.ready_timeout
+
+    def check_connection(self):
+        # wait for the ssh port to open then make sure a command can be run
+        logging.debug(f'waiting for the {self.name} machine to accept ssh connections...')
+        result = self.readiness.wait_for_ssh(self.ready_deadline_at)
+
+        if result.ready:
+            try:
                 self.bash_command('echo "connected"')
-            else:
-                logging.error(f'no ssh connection to the {self.name} machine could be made!')
+            except Exception as error:
+                result = result._replace(ready=False, error=str(error))
 
-        # if a connection error is thrown, try again and increase the fail count
-        except Exception:
-            self.check_connection(fail_count + 1)
+        if not result.ready:
+            logging.error(f'no ssh connection to the {self.name} machine could be made! {result.error}')
+        else:
+            logging.debug(f'connected to the {self.name} machine after {result.attempts} attempts')
 
-    def ping_bot(self, fail_count=1):
-        try:
-            logging.debug(f'attempt {fail_count} to ping {self.name} api server...')
-            if fail_count < 10:
-                # wait 1 second before pinging the server
-                time.sleep(1)
-                response = requests.get(f'http://{self.host_name}:8080/api/v1/ping')
-                return response
-            else:
-                logging.error(f'failed to ping {self.name} api server! {self.name} is not running!')
-                return None
-
-        except requests.exceptions.ConnectionError:
-            self.ping_bot(fail_count + 1)
-
-    def stop_bot(self, fail_count=0):
-        response = self.api_post('stop')
-        if response:
-            status = response['status']
-            if status != 'already stopped' and fail_count < 5:
-                logging.debug(f'{self.name} is {status}')
-                time.sleep(5)
-                self.stop_bot(fail_count + 1)
+        return result
+
+    def ping_bot(self):
+        logging.debug(f'waiting for the {self.name} api server...')
+        result = self.readiness.wait_for_api(self.ready_deadline_at)
+
+        if not result.ready:
+            logging.error(f'failed to ping {self.name} api server! {self.name} is not running!')
+
+        return result
+
+    def stop_bot(self):
+        # stop the bot and poll until it reports that it has stopped
+        state = FleetControl([self]).stop()[0]
+        if state.confirmed:
+            logging.debug(f'{self.name} is stopped')
+        else:
+            logging.debug(f'{self.name} could not be confirmed stopped: {state.state} {state.error}')
+            self.report_error(f'could not be confirmed stopped: {state.state} {state.error or ""}')
+
+        return state
+
+    def start_bot_command(self, detach=False):
+        # log to a file so the output can be tailed from the control box
+        command = f'freqtrade trade -c {self.config_file} -s {self.strategy_class} --logfile {self.log_file}'
+
+        # when run from a script the bot has to outlive the channel
+        if detach:
+            command = f'nohup {command} > /dev/null 2>&1 &'
+
+        return '\n'.join([
+            f'cd freqtrade/',
+            f'source .env/bin/activate',
+            command
+        ])
 
     def start_bot(self):
         # run the commands in a separate detached channel
         logging.debug(f'starting {self.name}...')
-        self.run_detached_command('\n'.join([
-            f'cd freqtrade/',
-            f'source .env/bin/activate',
-            f'freqtrade trade -c {self.config_file} -s {self.strategy_class}'
-        ]))
+        self.run_detached_command(self.start_bot_command())
 
         # ping the api to see if the bot is running
-        self.ping_bot()
+        if not self.ping_bot().ready:
+            raise RuntimeError(f'{self.name} api server did not come up')
+        self.record_started_files()
         logging.info(f'{self.name} is running!')
 
+    def install_strategy_command(self):
+        return '\n'.join([
+            f'cd freqtrade/user_data/strategies/',
+            f'wget -q {self.strategy_url} -O {self.strategy_file}'
+        ])
+
     def install_strategy(self):
         # download the latest strategy file
         logging.debug(f'{self.name} downloading strategy file {self.strategy_url}')
-        self.bash_command('\n'.join([
-            f'cd freqtrade/user_data/strategies/',
-            f'wget {self.strategy_url} -O {self.strategy_file}'
-        ]))
+        response = requests.get(self.strategy_url, timeout=30)
+        response.raise_for_status()
 
-    def install_config(self):
+        # only upload the strategy if it changed since the last push
+        return self.push_file(response.content, f'freqtrade/user_data/strategies/{self.strategy_file}')
+
+    def populate_config_values(self):
         # override these config key values using the bot data
         logging.debug(f'{self.name} populating bot_data into {self.config_file}')
         self.config_values['dry_run'] = self.dry_run
@@ -178,25 +268,203 @@ class Bot:
         self.config_values['api_server']['username'] = self.api_server_username
         self.config_values['api_server']['password'] = self.api_server_password
 
-        logging.debug(f'{self.name} downloading config file {self.config_url}')
-        self.bash_command('\n'.join([
-            f"config_data=$'{rapidjson.dumps(self.config_values, indent=2)}'",
-            f'config_file=/home/ubuntu/freqtrade/{self.config_file}',
-            f'echo "$config_data" > "$config_file"'
-        ]))
+    def install_config_command(self):
+        # write the config with a quoted heredoc so nothing in it is expanded by the shell
+        return '\n'.join([
+            f"cat > freqtrade/{self.config_file} <<'BOT_CONFIG_EOF'",
+            rapidjson.dumps(self.config_values, indent=2),
+            'BOT_CONFIG_EOF'
+        ])
 
-    def remove_databases(self):
-        logging.debug(f'{self.name} removing databases...')
+    def install_config(self):
+        self.populate_config_values()
+
+        # only upload the config if it changed since the last push
+        logging.debug(f'{self.name} uploading config file {self.config_file}')
+        config_data = rapidjson.dumps(self.config_values, indent=2).encode('utf-8')
+        return self.push_file(config_data, f'freqtrade/{self.config_file}')
+
+    def open_sftp(self):
+        transport = self.ssh_pool.get_transport(self.host_name, self.user_name, self.private_key)
+        return SFTPSync(transport)
+
+    def push_file(self, data, remote_path):
+        with self.trace('push_file', 'sftp') as span:
+            sftp_sync = self.open_sftp()
+            try:
+                changed = sftp_sync.push(data, remote_path)
+            finally:
+                sftp_sync.close()
+
+            if changed:
+                span.add_bytes(len(data))
+            return changed
+
+    def read_file(self, remote_path):
+        sftp_sync = self.open_sftp()
+        try:
+            return sftp_sync.read(remote_path)
+        finally:
+            sftp_sync.close()
+
+    def get_started_files(self):
+        return {'config': self.config_file, 'strategy': self.strategy_file}
+
+    def read_started_files(self):
+        sftp_sync = self.open_sftp()
+        try:
+            return sftp_sync.get_started()
+        finally:
+            sftp_sync.close()
+
+    def record_started_files(self):
+        sftp_sync = self.open_sftp()
+        try:
+            sftp_sync.set_started(self.get_started_files())
+        finally:
+            sftp_sync.close()
 
+    def get_changed_config_keys(self):
+        # compare the installed config with the one about to be installed
+        installed_config = self.read_file(f'freqtrade/{self.config_file}')
+        if installed_config is None:
+            return None
+
+        installed_values = rapidjson.loads(installed_config)
+        self.populate_config_values()
+
+        keys = set(installed_values.keys()) | set(self.config_values.keys())
+        return [key for key in keys if installed_values.get(key) != self.config_values.get(key)]
+
+    def hot_reload(self):
+        # a full reset has to sell everything and clear the databases, so it always reboots
+        if self.full_reset:
+            return False
+
+        # the running bot has to be reachable and running the same strategy
+        try:
+            running_config = self.api.get('show_config')
+        except Exception as error:
+            logging.debug(f'{self.name} api is not reachable, falling back to a reboot: {error}')
+            return False
+
+        if running_config.get('strategy', self.strategy_class) != self.strategy_class:
+            return False
+
+        # reload_conf re-reads the files the process was started with, so moving to other files needs a restart
+        if self.read_started_files() != self.get_started_files():
+            logging.debug(f'{self.name} was started with other files, falling back to a reboot')
+            return False
+
+        changed_keys = self.get_changed_config_keys()
+        if changed_keys is None or any(key in self.restart_config_keys for key in changed_keys):
+            return False
+
+        config_changed = self.install_config()
+        strategy_changed = self.install_strategy()
+
+        if not config_changed and not strategy_changed:
+            logging.info(f'{self.name} is already up to date')
+
+        # only the initial state changed, so just start or stop the bot
+        elif not strategy_changed and changed_keys == ['initial_state']:
+            logging.debug(f'{self.name} switching to {self.initial_state}...')
+            self.api.post('start' if self.initial_state == 'running' else 'stop')
+
+        # reload the config and strategy in place without restarting the process
+        else:
+            logging.debug(f'{self.name} reloading its config and strategy...')
+            self.api.post('reload_conf')
+
+            if not self.ping_bot().ready:
+                return False
+
+        logging.info(f'{self.name} was updated without a reboot')
+        return True
+
+    def remove_databases_command(self):
         if self.dry_run:
-            remove_database_command = 'rm tradesv3.dryrun.sqlite'
+            remove_database_command = 'rm -f tradesv3.dryrun.sqlite'
         else:
-            remove_database_command = 'rm tradesv3.sqlite'
+            remove_database_command = 'rm -f tradesv3.sqlite'
 
-        self.bash_command('\n'.join([
+        return '\n'.join([
             'cd freqtrade/',
             remove_database_command
-        ]))
+        ])
+
+    def harvest_trades(self):
+        # keep the closed trades in the central store before the database is removed
+        logging.debug(f'{self.name} harvesting trades...')
+        return TradeHarvester().harvest(self)
+
+    def remove_databases(self):
+        logging.debug(f'{self.name} removing databases...')
+        self.bash_command(self.remove_databases_command())
+
+    def build_update_script(self):
+        # the script rewrites the pushed files, so the next sftp push must not trust the manifest
+        steps = [
+            ('forget_uploads', f'rm -f {default_manifest_path}'),
+            ('install_config', self.install_config_command())
+        ]
+
+        if self.full_reset:
+            steps.append(('remove_databases', self.remove_databases_command()))
+
+        steps.append(('install_strategy', self.install_strategy_command()))
+        steps.append(('start_bot', self.start_bot_command(detach=True)))
+
+        # run each step in its own subshell from the home folder and report its exit code
+        lines = ['failed=0']
+        for step, command in steps:
+            lines.extend([
+                'if [ "$failed" -eq 0 ]; then',
+                '(',
+                'set -e',
+                'cd ~',
+                command,
+                ')',
+                'code=$?',
+                f'echo "STEP {step} $code"',
+                '[ "$code" -eq 0 ] || failed=1',
+                'else',
+                f'echo "STEP {step} skipped"',
+                'fi'
+            ])
+        lines.append('exit $failed')
+
+        return '\n'.join(lines)
+
+    def run_update_script(self):
+        self.populate_config_values()
+
+        # send every post reboot step in one script over a single channel
+        logging.debug(f'{self.name} running the update script...')
+        channel = self.open_connection()
+        channel.set_combine_stderr(True)
+        channel.exec_command(self.build_update_script())
+        output = channel.makefile('rb').read().decode('utf-8').split('\n')
+        channel.close()
+
+        # collect the exit code of each step
+        step_results = {}
+        for line in output:
+            if line.startswith('STEP '):
+                _, step, exit_code = line.split()
+                step_results[step] = exit_code
+
+        failed_steps = [step for step, exit_code in step_results.items() if exit_code != '0']
+        if failed_steps or not step_results:
+            raise RuntimeError(f'{self.name} update script failed at {failed_steps}: {step_results}')
+
+        # ping the api to see if the bot is running
+        if not self.ping_bot().ready:
+            raise RuntimeError(f'{self.name} api server did not come up')
+        self.record_started_files()
+        logging.info(f'{self.name} is running!')
+
+        return step_results
 
     def truncate(self, number, digits):
         stepper = 10.0 ** digits
@@ -204,28 +472,26 @@ class Bot:
 
     def api_post(self, command):
         try:
-            response = requests.post(
-                f'http://{self.host_name}:8080/api/v1/{command}',
-                auth=(self.api_server_username, self.api_server_password),
-                timeout=5
-            )
-            return json.loads(response.text)
+            return self.api.post(command)
         except Exception as error:
             self.report_error(str(error))
             return []
 
     def api_get(self, command):
         try:
-            response = requests.get(
-                f'http://{self.host_name}:8080/api/v1/{command}',
-                auth=(self.api_server_username, self.api_server_password),
-                timeout=5
-            )
-            return json.loads(response.text)
+            return self.api.get(command)
         except Exception as error:
             self.report_error(str(error))
             return []
 
+    def get_api_summary(self):
+        # get the status, profit, balance and count of the bot in one pass
+        try:
+            return self.api.get_summary()
+        except Exception as error:
+            self.report_error(str(error))
+            return {}
+
     def convert_coin_dust(self):
         # get the coins that are below the dust amount
         dust_coins = self.get_coin_balances(only_dust=True)
@@ -246,6 +512,9 @@ class Bot:
             except Exception as error:
                 logging.error(error)
 
+            # the balances changed so they need to be fetched again
+            self.market_snapshot.invalidate('balances')
+
     def sort_balances(self, balances):
         sorted_balances = []
 
@@ -257,58 +526,48 @@ class Bot:
 
     def cancel_all_orders(self):
         # get all open orders
-        orders = self.exchange.privateGetOpenOrders()
-        if orders:
-            logging.debug(f'{self.name} is canceling all orders...')
-
-            # get the full ticker names with slashes from symbols without slashes
-            symbols = {}
-            tickers = bot.exchange.fetchTickers()
-            for ticker in tickers.keys():
-                symbols[ticker.replace('/', '')] = ticker
-
-            # cancel each open order
-            for order in orders:
-                logging.debug(f"{self.name} canceling {order['side']} order for {order['symbol']}...")
-                self.exchange.cancel_order(
-                    order['orderId'],
-                    symbols[order['symbol']],
-                    params={
-                        'clientOrderId': order['clientOrderId']
-                    })
-
-    def get_prices(self):
-        prices = self.exchange.v3GetTickerPrice()
-        return {p['symbol']: float(p['price']) for p in prices}
+        with self.rate_limiter.weighted(40):
+            orders = self.exchange.privateGetOpenOrders()
+        if not orders:
+            return []
 
-    def get_balances(self):
-        account = self.exchange.fetchBalance(params={'type': 'SPOT'})['info']
-        return {b['asset']: float(b['free']) for b in account['balances']}
+        # cancel the open orders concurrently using the cached market index to look up the symbols
+        logging.debug(f'{self.name} is canceling {len(orders)} orders...')
+        results = OrderCanceler(self.exchange, self.market_index).cancel_all(orders)
 
-    def get_total_account_balance(self):
-        prices = self.get_prices()
-        balances = self.get_balances()
+        # canceled orders free up the locked balances
+        self.market_snapshot.invalidate('balances')
 
-        total = 0
+        failed = [result for result in results if not result.success]
+        if failed:
+            self.report_error(f'failed to cancel {len(failed)} of {len(results)} orders')
 
-        for ticker, amount in balances.items():
-            price = prices.get(f'{ticker}{self.stake_currency}') or prices.get(f'{self.stake_currency}{ticker}')
+        return results
 
-            if price and amount > 0:
-                total = total + price
+    def get_prices(self):
+        return self.market_snapshot.get_prices()
 
-        # get the price of the stake currency against the price of the fiat display currency
-        fiat_price = prices.get('USDT/USD')
-        #     f'{self.fiat_display_currency}{self.stake_currency}'
-        # ) or prices.get(
-        #     f'{self.stake_currency}{self.fiat_display_currency}'
-        # )
+    def get_balances(self):
+        return self.market_snapshot.get_balances()
+
+    def get_valuation_engine(self):
+        # binance has no fiat markets, so the stake coin is pegged to the usd
+        return ValuationEngine(
+            self.get_prices(),
+            self.market_index.get_symbols(),
+            extra_prices={'USDT/USD': 1.0}
+        )
 
-        print(fiat_price)
+    def get_total_account_balance(self):
+        # value every balance in the fiat display currency through the cheapest route of markets
+        engine = self.get_valuation_engine()
+        balances = self.get_balances()
 
-        total = (total + balances[self.stake_currency]) * fiat_price
+        unpriced_assets = engine.get_unpriced_assets(balances, self.fiat_display_currency)
+        if unpriced_assets:
+            logging.debug(f'{self.name} has no route to {self.fiat_display_currency} for {unpriced_assets}')
 
-        return total
+        return engine.value(balances, self.fiat_display_currency)
 
     def get_coin_balances(self, only_dust=False, only_non_dust=False):
         dust_coins = {}
@@ -350,65 +609,108 @@ class Bot:
     def convert_all_coins_to_stake_coin(self):
         # convert all non dust coins to the stake coin
         non_dust_coins = self.get_coin_balances(only_non_dust=True)
-        if non_dust_coins:
-            logging.debug(f'{self.name} is converting all coins to {self.stake_currency}...')
-            for ticker, amount in non_dust_coins.items():
-                try:
-                    self.exchange.create_market_sell_order(
-                        symbol=f'{ticker}/{self.stake_currency}',
-                        amount=self.truncate(amount, 4)
-                    )
-                    logging.debug(f"Selling {self.truncate(amount, 4)} of {ticker}/{self.stake_currency}")
-                except Exception as error:
-                    logging.error(error)
+        if not non_dust_coins:
+            return []
+
+        # sell every coin at once, sized to the lot size and notional filters of its market
+        logging.debug(f'{self.name} is converting all coins to {self.stake_currency}...')
+        liquidator = Liquidator(self.exchange, self.market_index, self.stake_currency)
+        results = liquidator.liquidate(non_dust_coins, self.get_prices())
+
+        # the balances changed so they need to be fetched again
+        self.market_snapshot.invalidate('balances')
+
+        proceeds = sum(result.proceeds for result in results)
+        sold = len([result for result in results if result.success])
+        logging.info(f'{self.name} sold {sold} of {len(results)} coins for {proceeds} {self.stake_currency}')
+
+        return results
 
     def report_error(self, message):
-        bot_error_message = f'{self.name} Error:\n{message}'
+        self.alert_dispatcher.report(self.name, message)
 
-        self.alert_bot.send_message(
-            chat_id=self.alert_bot_telegram_chat_id,
-            text=bot_error_message
-        )
+    def set_stage(self, stage):
+        self.stage = stage
+        if self.stage_callback:
+            self.stage_callback(self, stage)
 
-    def update_bot(self):
-        # check the connection
-        self.check_connection()
+    def require_connection(self):
+        if not self.check_connection().ready:
+            raise ConnectionError(f'no ssh connection to the {self.name} machine could be made')
 
-        # stop the bot
-        self.stop_bot()
+    def get_update_signature(self):
+        # a checkpoint only applies to an update with the same inputs
+        return '|'.join([self.config_url, self.strategy_url, str(self.full_reset), str(self.single_round_trip)])
+
+    def get_update_stages(self):
+        # the connection is checked by update_bot before the stages run
+        stages = [Stage('stop_bot', self.stop_bot, True)]
 
         # if it is a full reset, delete the databases and sell all alt coins
         if self.full_reset:
-            self.cancel_all_orders()
-            self.convert_all_coins_to_stake_coin()
-            self.convert_coin_dust()
-            self.remove_databases()
+            stages.extend([
+                Stage('cancel_all_orders', self.cancel_all_orders, True),
+                Stage('convert_all_coins_to_stake_coin', self.convert_all_coins_to_stake_coin, True),
+                Stage('convert_coin_dust', self.convert_coin_dust, True),
+                Stage('harvest_trades', self.harvest_trades, True)
+            ])
+
+            # the update script removes the databases itself after the reboot
+            if not self.single_round_trip:
+                stages.append(Stage('remove_databases', self.remove_databases, True))
+
+        # reboot the remote machine and check the connection again once it is back
+        stages.extend([
+            Stage('reboot_machine', self.reboot_machine, True),
+            Stage('wait_for_reboot', self.require_connection, False)
+        ])
+
+        # install everything and start the bot in one round trip
+        if self.single_round_trip:
+            stages.append(Stage('run_update_script', self.run_update_script, True))
+        else:
+            stages.extend([
+                Stage('install_config', self.install_config, True),
+                Stage('install_strategy', self.install_strategy, True),
+                Stage('start_bot', self.start_bot, True)
+            ])
 
-        # reboot the remote machine
-        self.reboot_machine()
+        return stages
 
-        # check the connection again since we just rebooted
-        self.check_connection()
+    def update_bot(self, resume=False):
+        # the update still connects, uploads and harvests over ssh whatever transport runs the commands
+        if self.transport == 'ssm' and not self.private_key_file:
+            raise ValueError(f'{self.name} can not be updated over ssm alone, set its private_key for ssh access')
 
-        # install the config
-        self.install_config()
+        self.ready_deadline_at = None
+        checkpoint = Checkpoint(self.name, self.get_update_signature())
+        if not resume:
+            checkpoint.clear()
 
-        # install the strategy
-        self.install_strategy()
+        # check the connection
+        self.set_stage('check_connection')
+        with self.trace('check_connection'):
+            self.require_connection()
 
-        # start the bot
-        self.start_bot()
+        # apply the changes to the running bot when they do not need a reboot, unless resuming a started update
+        if self.allow_hot_reload and not checkpoint.completed:
+            self.set_stage('hot_reload')
+            try:
+                with self.trace('hot_reload'):
+                    hot_reloaded = self.hot_reload()
+                if hot_reloaded:
+                    self.set_stage('done')
+                    return
+            except Exception as error:
+                logging.warning(f'{self.name} hot reload failed, falling back to a reboot: {error}')
 
+        # run the remaining stages, recording each one as it completes
+        UpdatePipeline(self, self.get_update_stages(), checkpoint).run()
 
-if __name__ == "__main__":
-    with open('../bots_config.json') as bots_config:
-        data = json.load(bots_config)
 
-    for bot_data in data['bots_data']:
-        # instantiate a new bot connection
-        bot = Bot(bot_data, data['bot_alerts'])
+if __name__ == "__main__":
+    import sys
+    from fleet import main
 
-        if bot_data['update']:
-            # update the bot on a separate thread
-            update_bot_thread = threading.Thread(target=bot.update_bot)
-            update_bot_thread.start()
+    # update the fleet with a limited number of bots at a time
+    sys.exit(main())
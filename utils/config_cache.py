@@ -0,0 +1,90 @@
+import os
+import copy
+import json
+import hashlib
+import logging
+import requests
+import rapidjson
+import threading
+from files import write_json
+
+cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'cache', 'configs')
+
+
+class ConfigCache:
+    def __init__(self, folder=cache_folder, timeout=10):
+        self.folder = folder
+        self.timeout = timeout
+        self.configs = {}
+        self.url_locks = {}
+        self.lock = threading.Lock()
+
+    def get_url_lock(self, url):
+        with self.lock:
+            if url not in self.url_locks:
+                self.url_locks[url] = threading.Lock()
+            return self.url_locks[url]
+
+    def get_entry_path(self, url):
+        return os.path.join(self.folder, f'{hashlib.sha1(url.encode("utf-8")).hexdigest()}.json')
+
+    def load_entry(self, url):
+        try:
+            with open(self.get_entry_path(url)) as entry_file:
+                return json.load(entry_file)
+        except (IOError, ValueError):
+            return None
+
+    def save_entry(self, url, response):
+        os.makedirs(self.folder, exist_ok=True)
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': response.text
+        }
+
+        write_json(self.get_entry_path(url), entry)
+
+    def fetch(self, url):
+        entry = self.load_entry(url)
+
+        # only download the body again if it changed since the cached copy
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = requests.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry:
+                logging.debug(f'config {url} is unchanged')
+                return entry['body']
+
+            response.raise_for_status()
+            logging.debug(f'downloaded config {url}')
+            self.save_entry(url, response)
+            return response.text
+
+        # keep working from the last copy if the config host is unreachable
+        except requests.RequestException as error:
+            if not entry:
+                raise
+            logging.warning(f'could not fetch config {url}, using the cached copy: {error}')
+            return entry['body']
+
+    def get(self, url):
+        # bots using the same config url wait on one download instead of each making their own
+        with self.get_url_lock(url):
+            if url not in self.configs:
+                self.configs[url] = rapidjson.loads(
+                    self.fetch(url),
+                    parse_mode=rapidjson.PM_COMMENTS | rapidjson.PM_TRAILING_COMMAS
+                )
+
+        # every bot gets its own copy since the values are overridden per bot
+        return copy.deepcopy(self.configs[url])
+
+
+config_cache = ConfigCache()
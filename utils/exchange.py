@@ -0,0 +1,15 @@
+import ccxt
+from rate_limiter import get_rate_limiter
+
+
+def create_exchange(api_key, secret, exchange_name='binance'):
+    exchange_class = getattr(ccxt, exchange_name)
+    exchange = exchange_class({
+        'apiKey': api_key,
+        'secret': secret,
+        'timeout': 30000,
+        'enableRateLimit': True,
+    })
+
+    # throttle through the limiter shared by everything using this key
+    return get_rate_limiter(api_key).attach(exchange)
@@ -0,0 +1,17 @@
+import os
+import json
+
+
+def write_atomic(path, text):
+    # write to a temporary file first so a crash or a reader never sees half a file
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    with open(f'{path}.tmp', 'w') as temporary_file:
+        temporary_file.write(text)
+    os.replace(f'{path}.tmp', path)
+
+
+def write_json(path, value, indent=None):
+    write_atomic(path, json.dumps(value, indent=indent))
@@ -0,0 +1,189 @@
+import sys
+import time
+import json
+import asyncio
+import logging
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from bot import Bot
+from rate_limiter import connect_broker
+from alerts import close_alert_dispatchers
+from tracing import tracer
+from price_book import start_price_book, ReplayTransport
+
+BotResult = namedtuple('BotResult', ['name', 'success', 'duration', 'stage', 'error'])
+
+
+class FleetOrchestrator:
+    def __init__(self, bots, concurrency=4, batch_size=None, canaries=None, health_check_attempts=3, resume=False):
+        self.bots = bots
+        self.resume = resume
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self.canaries = canaries or []
+        self.health_check_attempts = health_check_attempts
+        self.results = []
+
+    def log_stage(self, bot, stage):
+        logging.info(f'[{bot.name}] {stage}...')
+
+    async def update(self, bot, semaphore, executor):
+        async with semaphore:
+            bot.stage_callback = self.log_stage
+            start = time.monotonic()
+            loop = asyncio.get_event_loop()
+
+            # the bot methods are blocking so run them on the worker threads
+            try:
+                await loop.run_in_executor(executor, partial(bot.update_bot, resume=self.resume))
+                result = BotResult(bot.name, True, time.monotonic() - start, bot.stage, None)
+            except Exception as error:
+                logging.error(f'{bot.name} failed during {bot.stage}: {error}')
+                result = BotResult(bot.name, False, time.monotonic() - start, bot.stage, str(error))
+
+            self.results.append(result)
+            return result
+
+    async def update_all(self):
+        # limit how many bots are updated at the same time
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return await asyncio.gather(*[
+                self.update(bot, semaphore, executor) for bot in self.bots
+            ])
+
+    def is_healthy(self, bot):
+        # the bot is healthy once both the ping and status endpoints answer
+        for attempt in range(self.health_check_attempts):
+            try:
+                bot.api.get('ping')
+                bot.api.get('status')
+                return True
+            except Exception as error:
+                logging.debug(f'{bot.name} health check {attempt + 1} failed: {error}')
+                time.sleep(2 ** attempt)
+
+        return False
+
+    def get_batches(self):
+        # update the canaries first, or the first bot if none are set, then the rest in batches
+        canaries = [bot for bot in self.bots if bot.name in self.canaries] or self.bots[:1]
+        remaining = [bot for bot in self.bots if bot not in canaries]
+        batches = [canaries]
+        for index in range(0, len(remaining), self.batch_size):
+            batches.append(remaining[index:index + self.batch_size])
+
+        return canaries, batches
+
+    async def rolling_update_all(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        canaries, batches = self.get_batches()
+        loop = asyncio.get_event_loop()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for index, batch in enumerate(batches):
+                logging.info(f'updating batch {index + 1} of {len(batches)}: {[bot.name for bot in batch]}')
+                results = await asyncio.gather(*[self.update(bot, semaphore, executor) for bot in batch])
+
+                # gate the next batch on the canaries and this batch being healthy
+                checked = canaries + [bot for bot in batch if bot not in canaries]
+                healthy = await asyncio.gather(*[
+                    loop.run_in_executor(executor, self.is_healthy, bot) for bot in checked
+                ])
+
+                if all(result.success for result in results) and all(healthy):
+                    continue
+
+                unhealthy = [bot.name for bot, is_healthy in zip(checked, healthy) if not is_healthy]
+                logging.error(f'aborting the rollout after batch {index + 1}, unhealthy bots {unhealthy}')
+
+                # an update that finished but left the bot unhealthy counts as a failure
+                self.results = [
+                    result._replace(success=False, stage='health_check', error='unhealthy after update')
+                    if result.name in unhealthy and result.success else result
+                    for result in self.results
+                ]
+
+                # the bots in the later batches are left untouched
+                for skipped_batch in batches[index + 1:]:
+                    for bot in skipped_batch:
+                        self.results.append(BotResult(bot.name, False, 0, None, 'rollout aborted'))
+                break
+
+    def run(self):
+        self.results = []
+        if self.batch_size:
+            asyncio.run(self.rolling_update_all())
+        else:
+            asyncio.run(self.update_all())
+        self.log_summary()
+        return self.exit_code()
+
+    def log_summary(self):
+        for result in sorted(self.results, key=lambda r: r.name):
+            if result.success:
+                logging.info(f'{result.name} updated in {result.duration:.1f}s')
+            else:
+                logging.error(f'{result.name} failed at {result.stage} after {result.duration:.1f}s: {result.error}')
+
+        failed = len([result for result in self.results if not result.success])
+        logging.info(f'{len(self.results) - failed} of {len(self.results)} bots updated, {failed} failed')
+
+    def exit_code(self):
+        # a non zero exit code if any bot in the fleet failed
+        if all(result.success for result in self.results):
+            return 0
+        return 1
+
+
+def load_bots_config(bots_config_path='../bots_config.json'):
+    with open(bots_config_path) as bots_config:
+        return json.load(bots_config)
+
+
+def load_bots(data, names=None, only_updating=False):
+    # build the bots of the config, optionally only the named ones or the ones being updated
+    return [
+        Bot(bot_data, data['bot_alerts']) for bot_data in data['bots_data']
+        if (not names or bot_data['name'] in names) and (not only_updating or bot_data['update'])
+    ]
+
+
+def main(bots_config_path='../bots_config.json'):
+    data = load_bots_config(bots_config_path)
+
+    # share the exchange rate limits with other processes through the local broker
+    rate_limit_broker = data.get('rate_limit_broker')
+    if rate_limit_broker:
+        connect_broker(rate_limit_broker['host'], rate_limit_broker['port'])
+
+    # stream the prices once for every bot instead of polling the ticker endpoint
+    price_stream = data.get('price_stream')
+    if price_stream is not None:
+        start_price_book(ReplayTransport(price_stream['replay']) if price_stream.get('replay') else None)
+
+    # only instantiate the bots that are being updated
+    bots = load_bots(data, only_updating=True)
+
+    fleet_config = data.get('fleet', {})
+    fleet = FleetOrchestrator(
+        bots,
+        concurrency=fleet_config.get('concurrency', 4),
+        batch_size=fleet_config.get('batch_size'),
+        canaries=fleet_config.get('canaries'),
+        resume=fleet_config.get('resume', False)
+    )
+    exit_code = fleet.run()
+
+    # send any grouped alerts that are still waiting
+    close_alert_dispatchers()
+
+    # write the stage and remote call timings of this run
+    tracer.export()
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
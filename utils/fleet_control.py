@@ -0,0 +1,111 @@
+import sys
+import time
+import logging
+import requests
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+BotState = namedtuple('BotState', ['name', 'target', 'state', 'confirmed', 'duration', 'error'])
+
+
+class FleetControl:
+    def __init__(self, bots, timeout=30, initial_interval=0.2, max_interval=2, max_workers=32):
+        self.bots = bots
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.max_workers = max_workers
+
+    def send(self, bot, command):
+        try:
+            bot.api.post(command)
+            return None
+        except Exception as error:
+            return str(error)
+
+    def get_state(self, bot):
+        try:
+            return bot.api.get('show_config').get('state'), None
+        except requests.exceptions.ConnectionError as error:
+            return 'unreachable', str(error)
+        except Exception as error:
+            return None, str(error)
+
+    def apply(self, command, target):
+        started_at = time.monotonic()
+        states = {}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.bots) or 1)) as executor:
+            # send the command to every bot at once
+            errors = dict(zip(self.bots, executor.map(lambda bot: self.send(bot, command), self.bots)))
+            interval = self.initial_interval
+
+            # a bot that did not take the command will not change state, so it is not polled
+            pending = []
+            for bot in self.bots:
+                if errors[bot]:
+                    duration = time.monotonic() - started_at
+                    states[bot.name] = BotState(bot.name, target, 'unreachable', False, duration, errors[bot])
+                else:
+                    pending.append(bot)
+
+            # poll the bots that have not settled, starting fast and slowing down the longer it takes
+            while pending:
+                results = list(executor.map(self.get_state, pending))
+                still_pending = []
+
+                for bot, (state, error) in zip(pending, results):
+                    duration = time.monotonic() - started_at
+                    states[bot.name] = BotState(bot.name, target, state, state == target, duration, error)
+                    if state not in [target, 'unreachable']:
+                        still_pending.append(bot)
+
+                pending = still_pending
+                if not pending or time.monotonic() - started_at + interval > self.timeout:
+                    break
+
+                time.sleep(interval)
+                interval = min(self.max_interval, interval * 2)
+
+        return [states[bot.name] for bot in self.bots]
+
+    def stop(self):
+        return self.apply('stop', 'stopped')
+
+    def start(self):
+        return self.apply('start', 'running')
+
+    def restart(self):
+        stopped = self.stop()
+
+        # only start the bots again once the whole set has stopped
+        if not all(state.confirmed for state in stopped):
+            return stopped
+        return self.start()
+
+
+def format_states(states):
+    rows = [f'{"bot":<30}{"target":<10}{"state":<10}{"confirmed":<11}{"seconds":>8}  error']
+    for state in states:
+        rows.append(
+            f'{state.name:<30}{state.target:<10}{str(state.state):<10}{str(state.confirmed):<11}'
+            f'{state.duration:>8.2f}  {state.error or ""}'
+        )
+
+    return '\n'.join(rows)
+
+
+if __name__ == '__main__':
+    from fleet import load_bots_config, load_bots
+
+    # python fleet_control.py stop|start|restart [bot names]
+    if len(sys.argv) < 2 or sys.argv[1] not in ['stop', 'start', 'restart']:
+        print('usage: fleet_control.py stop|start|restart [bot names]')
+        sys.exit(1)
+
+    bots = load_bots(load_bots_config(), sys.argv[2:])
+
+    logging.getLogger().setLevel(logging.INFO)
+    bot_states = getattr(FleetControl(bots), sys.argv[1])()
+    print(format_states(bot_states))
+    sys.exit(0 if all(bot_state.confirmed for bot_state in bot_states) else 1)
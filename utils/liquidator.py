@@ -0,0 +1,102 @@
+import ccxt
+import logging
+from decimal import Decimal, ROUND_DOWN
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+LiquidationResult = namedtuple('LiquidationResult', ['asset', 'symbol', 'amount', 'success', 'proceeds', 'error'])
+
+
+class Liquidator:
+    def __init__(self, exchange, market_index, stake_currency, max_workers=8, max_retries=2):
+        # the sells are paced by the rate limiter attached to the exchange
+        self.exchange = exchange
+        self.market_index = market_index
+        self.stake_currency = stake_currency
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+
+    def get_step_size(self, market):
+        # market orders use the market lot size when the exchange sets one
+        for filter_type in ['MARKET_LOT_SIZE', 'LOT_SIZE']:
+            lot_size = market['filters'].get(filter_type)
+            if lot_size and Decimal(lot_size['stepSize']) > 0:
+                return Decimal(lot_size['stepSize']), Decimal(lot_size['minQty'])
+
+        amount_precision = market['precision'].get('amount')
+        if amount_precision is not None:
+            return Decimal(1).scaleb(-int(amount_precision)), Decimal(0)
+
+        return Decimal('0.00000001'), Decimal(0)
+
+    def get_min_notional(self, market):
+        min_notional = market['filters'].get('MIN_NOTIONAL') or market['filters'].get('NOTIONAL')
+        if min_notional:
+            return Decimal(min_notional['minNotional'])
+
+        return Decimal(str(market['limits'].get('cost', {}).get('min') or 0))
+
+    def size_order(self, market, amount, price):
+        step_size, min_amount = self.get_step_size(market)
+
+        # round the amount down to a whole number of steps so the exchange accepts it
+        amount = (Decimal(str(amount)) / step_size).to_integral_value(rounding=ROUND_DOWN) * step_size
+
+        if amount < min_amount or amount <= 0:
+            return None, 'below the minimum lot size'
+
+        if price and amount * Decimal(str(price)) < self.get_min_notional(market):
+            return None, 'below the minimum notional'
+
+        return amount, None
+
+    def sell(self, asset, amount, price):
+        symbol = f'{asset}/{self.stake_currency}'
+        market = self.market_index.get_market(symbol)
+        if not market or not market['active']:
+            return LiquidationResult(asset, symbol, amount, False, 0, 'no active market')
+
+        order_amount, error = self.size_order(market, amount, price)
+        if not order_amount:
+            return LiquidationResult(asset, symbol, amount, False, 0, error)
+
+        step_size, _ = self.get_step_size(market)
+        for _ in range(self.max_retries + 1):
+            try:
+                order = self.exchange.create_market_sell_order(symbol=symbol, amount=float(order_amount))
+                proceeds = order.get('cost') or float(order_amount) * (price or 0)
+                logging.debug(f'sold {order_amount} of {symbol} for {proceeds} {self.stake_currency}')
+                return LiquidationResult(asset, symbol, float(order_amount), True, proceeds, None)
+
+            # fees or rounding left less free balance than expected, so sell one step less
+            except ccxt.InsufficientFunds as exception:
+                error = str(exception)
+                order_amount = order_amount - step_size
+                if order_amount <= 0:
+                    break
+
+            # the request was throttled before it reached the matching engine, so it is safe to send again
+            except ccxt.DDoSProtection as exception:
+                error = str(exception)
+
+            except Exception as exception:
+                error = str(exception)
+                break
+
+        return LiquidationResult(asset, symbol, float(order_amount), False, 0, error)
+
+    def liquidate(self, balances, prices):
+        if not balances:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(balances))) as executor:
+            results = list(executor.map(
+                lambda item: self.sell(item[0], item[1], prices.get(f'{item[0]}{self.stake_currency}')),
+                balances.items()
+            ))
+
+        for result in results:
+            if not result.success:
+                logging.error(f'failed to sell {result.amount} of {result.symbol}: {result.error}')
+
+        return results
@@ -0,0 +1,102 @@
+import re
+import sys
+import queue
+import logging
+import threading
+from collections import deque
+
+
+class HostLogTail:
+    def __init__(self, bot, output, buffer_size=1000):
+        self.bot = bot
+        self.output = output
+        self.log_file = f'freqtrade/{bot.log_file}'
+        self.buffer = deque(maxlen=buffer_size)
+        self.stopped = threading.Event()
+        self.command = None
+        self.thread = None
+
+    def read_lines(self):
+        # one long lived channel per host, read as the data arrives rather than all at once
+        self.command = self.bot.stream_command(f'tail -n 0 -F {self.log_file}')
+        for stream, line in self.command:
+            if self.stopped.is_set():
+                return
+            yield line
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                for line in self.read_lines():
+                    self.buffer.append(line)
+                    self.output.put(self.bot.name, line)
+            except Exception as error:
+                logging.warning(f'log tail of {self.bot.name} dropped, reconnecting: {error}')
+
+            # wait before reconnecting, the host may be rebooting
+            self.stopped.wait(5)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f'log-tail-{self.bot.name}', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.command:
+            self.command.cancel()
+
+
+class FleetLogStream:
+    def __init__(self, bots, max_queue_size=10000, **tail_options):
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.tails = {bot.name: HostLogTail(bot, self, **tail_options) for bot in bots}
+
+    def put(self, name, line):
+        # never let a slow reader hold up the hosts, drop the oldest line instead
+        while True:
+            try:
+                self.queue.put_nowait((name, line))
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def start(self):
+        for tail in self.tails.values():
+            tail.start()
+        return self
+
+    def stop(self):
+        for tail in self.tails.values():
+            tail.stop()
+
+    def recent(self, name, count=100):
+        return list(self.tails[name].buffer)[-count:]
+
+    def lines(self, pattern=None, names=None):
+        # yield the merged lines of every host one at a time as they arrive
+        expression = re.compile(pattern) if pattern else None
+        while True:
+            name, line = self.queue.get()
+            if names and name not in names:
+                continue
+            if expression and not expression.search(line):
+                continue
+            yield name, line
+
+
+if __name__ == '__main__':
+    from fleet import load_bots_config, load_bots
+
+    # python log_tail.py [pattern]
+    bots = load_bots(load_bots_config())
+    stream = FleetLogStream(bots).start()
+    try:
+        for bot_name, log_line in stream.lines(sys.argv[1] if len(sys.argv) > 1 else None):
+            print(f'[{bot_name}] {log_line}', flush=True)
+    except KeyboardInterrupt:
+        stream.stop()
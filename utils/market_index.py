@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import logging
+import threading
+from files import write_json
+
+cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'cache')
+
+
+class MarketIndex:
+    def __init__(self, exchange, refresh_interval=6 * 60 * 60, cache_path=None):
+        self.exchange = exchange
+        self.refresh_interval = refresh_interval
+        self.cache_path = cache_path or os.path.join(cache_folder, f'markets_{exchange.id}.json')
+        self.markets = {}
+        self.symbols = {}
+        self.updated_at = 0
+        self.lock = threading.Lock()
+
+    def build(self, markets):
+        # keep only what is needed to map and size orders
+        self.markets = {}
+        for symbol, market in markets.items():
+            self.markets[symbol] = {
+                'id': market['id'],
+                'symbol': symbol,
+                'base': market['base'],
+                'quote': market['quote'],
+                'active': market.get('active', True),
+                'precision': market.get('precision', {}),
+                'limits': market.get('limits', {}),
+                'filters': {f['filterType']: f for f in market.get('info', {}).get('filters', [])}
+            }
+
+        self.symbols = {market['id']: symbol for symbol, market in self.markets.items()}
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path) as cache_file:
+                cache = json.load(cache_file)
+        except (IOError, ValueError):
+            return False
+
+        self.markets = cache['markets']
+        self.symbols = {market['id']: symbol for symbol, market in self.markets.items()}
+        self.updated_at = cache['updated_at']
+        return True
+
+    def save_cache(self):
+        write_json(self.cache_path, {'updated_at': self.updated_at, 'markets': self.markets})
+
+    def refresh(self):
+        logging.debug(f'refreshing the {self.exchange.id} market index...')
+        self.build(self.exchange.load_markets(reload=True))
+        self.updated_at = time.time()
+        self.save_cache()
+
+    def ensure_fresh(self):
+        with self.lock:
+            if not self.markets:
+                self.load_cache()
+
+            if time.time() - self.updated_at > self.refresh_interval:
+                try:
+                    self.refresh()
+                except Exception as error:
+                    # fall back to the stale index rather than failing the caller
+                    if not self.markets:
+                        raise
+                    logging.warning(f'could not refresh the {self.exchange.id} market index: {error}')
+
+    def get_symbol(self, market_id):
+        self.ensure_fresh()
+        return self.symbols.get(market_id)
+
+    def get_symbols(self):
+        self.ensure_fresh()
+        return self.symbols
+
+    def get_market(self, symbol):
+        self.ensure_fresh()
+        return self.markets.get(symbol)
+
+
+market_indexes = {}
+market_indexes_lock = threading.Lock()
+
+
+def get_market_index(exchange):
+    # market metadata is the same for every account so one index is shared per exchange
+    with market_indexes_lock:
+        if exchange.id not in market_indexes:
+            market_indexes[exchange.id] = MarketIndex(exchange)
+        return market_indexes[exchange.id]
@@ -0,0 +1,57 @@
+import time
+import logging
+import threading
+from price_book import get_price_book
+
+
+class MarketSnapshot:
+    def __init__(self, exchange, rate_limiter, ttl=10, price_book_max_age=30):
+        self.exchange = exchange
+        self.rate_limiter = rate_limiter
+        self.price_book_max_age = price_book_max_age
+        self.ttls = {
+            'prices': ttl,
+            'balances': ttl
+        }
+        self.values = {}
+        self.fetched_at = {}
+        self.lock = threading.RLock()
+
+    def fetch_prices(self):
+        # read the streamed prices from memory while the stream is up to date
+        price_book = get_price_book()
+        if price_book and price_book.seeded and price_book.age() < self.price_book_max_age:
+            return price_book.get_prices()
+
+        with self.rate_limiter.weighted(2):
+            prices = self.exchange.v3GetTickerPrice()
+        return {p['symbol']: float(p['price']) for p in prices}
+
+    def fetch_balances(self):
+        with self.rate_limiter.weighted(5):
+            account = self.exchange.fetchBalance(params={'type': 'SPOT'})['info']
+        return {b['asset']: float(b['free']) for b in account['balances']}
+
+    def get(self, part):
+        with self.lock:
+            fetched_at = self.fetched_at.get(part)
+
+            # only hit the exchange again once the cached value is older than its ttl
+            if fetched_at is None or time.monotonic() - fetched_at > self.ttls[part]:
+                logging.debug(f'refreshing the {part} snapshot...')
+                self.values[part] = getattr(self, f'fetch_{part}')()
+                self.fetched_at[part] = time.monotonic()
+
+            return self.values[part]
+
+    def get_prices(self):
+        return self.get('prices')
+
+    def get_balances(self):
+        return self.get('balances')
+
+    def invalidate(self, *parts):
+        # drop the given parts, or everything, so the next read fetches fresh values
+        with self.lock:
+            for part in parts or list(self.fetched_at.keys()):
+                self.fetched_at.pop(part, None)
@@ -0,0 +1,44 @@
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+CancelResult = namedtuple('CancelResult', ['order_id', 'symbol', 'side', 'success', 'error'])
+
+
+class OrderCanceler:
+    def __init__(self, exchange, market_index, max_workers=8):
+        # the cancels are paced by the rate limiter attached to the exchange
+        self.exchange = exchange
+        self.market_index = market_index
+        self.max_workers = max_workers
+
+    def cancel(self, order):
+        symbol = self.market_index.get_symbol(order['symbol'])
+        if not symbol:
+            return CancelResult(order['orderId'], order['symbol'], order['side'], False, 'unknown market')
+
+        try:
+            self.exchange.cancel_order(
+                order['orderId'],
+                symbol,
+                params={
+                    'clientOrderId': order['clientOrderId']
+                })
+            return CancelResult(order['orderId'], symbol, order['side'], True, None)
+        except Exception as error:
+            return CancelResult(order['orderId'], symbol, order['side'], False, str(error))
+
+    def cancel_all(self, orders):
+        if not orders:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(orders))) as executor:
+            results = list(executor.map(self.cancel, orders))
+
+        for result in results:
+            if result.success:
+                logging.debug(f'canceled {result.side} order {result.order_id} for {result.symbol}')
+            else:
+                logging.error(f'failed to cancel {result.side} order {result.order_id} for {result.symbol}: {result.error}')
+
+        return results
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+snapshot_database = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'snapshots.sqlite')
+
+snapshot_fields = [
+    'taken_at', 'bot', 'config', 'strategy', 'online', 'open_trades', 'trade_count',
+    'profit_closed', 'profit_all', 'balance', 'balance_fiat', 'stake_currency', 'profit_closed_fiat',
+    'profit_all_fiat'
+]
+
+# each bot reports these in its own stake coin, so they are only added up per stake currency
+stake_fields = ['profit_closed', 'profit_all', 'balance']
+fiat_fields = ['profit_closed_fiat', 'profit_all_fiat', 'balance_fiat']
+
+
+class SnapshotStore:
+    def __init__(self, path=snapshot_database):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS snapshots ({", ".join(snapshot_fields)})')
+
+            # add the columns that are newer than the store
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(snapshots)')]
+            for field in snapshot_fields:
+                if field not in columns:
+                    self.connection.execute(f'ALTER TABLE snapshots ADD COLUMN {field}')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS snapshots_bot_time ON snapshots (bot, taken_at)')
+
+    def append(self, snapshots):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f'INSERT INTO snapshots VALUES ({", ".join("?" * len(snapshot_fields))})',
+                [[snapshot[field] for field in snapshot_fields] for snapshot in snapshots]
+            )
+
+    def load_since(self, taken_at, bot_names):
+        with self.lock:
+            rows = self.connection.execute(
+                f'SELECT {", ".join(snapshot_fields)} FROM snapshots WHERE taken_at >= ? AND bot IN ({", ".join("?" * len(bot_names))}) '
+                'ORDER BY taken_at',
+                [taken_at, *bot_names]
+            ).fetchall()
+        return [dict(zip(snapshot_fields, row)) for row in rows]
+
+
+class PerformanceAggregator:
+    def __init__(self, bots, store=None, interval=60, history_size=1440, max_workers=16):
+        self.bots = bots
+        self.store = store or SnapshotStore()
+        self.interval = interval
+        self.max_workers = max_workers
+        self.history = defaultdict(lambda: deque(maxlen=history_size))
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+        # warm the in memory history from the store so deltas work straight after a restart, bots removed
+        # from the config since then are left out
+        self.bot_names = [bot.name for bot in bots]
+        for snapshot in self.store.load_since(time.time() - interval * history_size, self.bot_names):
+            self.history[snapshot['bot']].append(snapshot)
+
+    def take_snapshot(self, bot, taken_at):
+        snapshot = dict.fromkeys(snapshot_fields, 0)
+        snapshot.update({
+            'taken_at': taken_at,
+            'bot': bot.name,
+            'config': bot.config_file,
+            'strategy': bot.strategy_class,
+            'online': 0,
+            'stake_currency': ''
+        })
+
+        try:
+            summary = bot.api.get_summary()
+        except Exception as error:
+            logging.debug(f'{bot.name} snapshot failed: {error}')
+            return snapshot
+
+        # keep only the few numbers the views need
+        snapshot.update({
+            'online': 1,
+            'open_trades': len(summary['status']),
+            'trade_count': summary['profit'].get('trade_count', 0),
+            'profit_closed': summary['profit'].get('profit_closed_coin', 0),
+            'profit_all': summary['profit'].get('profit_all_coin', 0),
+            'balance': summary['balance'].get('total', 0),
+            'balance_fiat': summary['balance'].get('value', 0),
+            'stake_currency': summary['balance'].get('stake', ''),
+            'profit_closed_fiat': summary['profit'].get('profit_closed_fiat', 0),
+            'profit_all_fiat': summary['profit'].get('profit_all_fiat', 0)
+        })
+        return snapshot
+
+    def poll(self):
+        taken_at = time.time()
+
+        # ask every bot at once, then store the whole round together
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.bots) or 1)) as executor:
+            snapshots = list(executor.map(lambda bot: self.take_snapshot(bot, taken_at), self.bots))
+
+        self.store.append(snapshots)
+        with self.lock:
+            for snapshot in snapshots:
+                self.history[snapshot['bot']].append(snapshot)
+
+        return snapshots
+
+    def latest(self):
+        with self.lock:
+            return [self.history[name][-1] for name in self.bot_names if self.history[name]]
+
+    def totals(self, group_by=None):
+        # sum the latest snapshot of every bot, for the whole fleet or per config or strategy
+        totals = defaultdict(lambda: defaultdict(float))
+        stakes = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+        for snapshot in self.latest():
+            group = snapshot[group_by] if group_by else 'fleet'
+            totals[group]['bots'] += 1
+            for field in ['online', 'open_trades', 'trade_count'] + fiat_fields:
+                totals[group][field] += snapshot[field] or 0
+
+            # btc and usdt amounts are never added together
+            if snapshot['online']:
+                for field in stake_fields:
+                    stakes[group][snapshot['stake_currency']][field] += snapshot[field] or 0
+
+        return {
+            group: dict(values, stake={currency: dict(stake) for currency, stake in stakes[group].items()})
+            for group, values in totals.items()
+        }
+
+    def deltas(self, window=24 * 60 * 60):
+        # the change of each bot since the oldest snapshot inside the window, skipping rounds it was offline
+        since = time.time() - window
+        deltas = {}
+        with self.lock:
+            for name, history in self.history.items():
+                snapshots = [snapshot for snapshot in history if snapshot['taken_at'] >= since and snapshot['online']]
+                if len(snapshots) < 2:
+                    continue
+                first, last = snapshots[0], snapshots[-1]
+                # snapshots stored before a field existed have no value to compare with
+                deltas[name] = {
+                    field: None if first[field] is None or last[field] is None else last[field] - first[field]
+                    for field in ['trade_count'] + stake_fields + fiat_fields
+                }
+                deltas[name]['stake_currency'] = last['stake_currency']
+
+        return deltas
+
+    def run(self):
+        while not self.stopped.is_set():
+            started_at = time.monotonic()
+            try:
+                self.poll()
+            except Exception as error:
+                logging.error(f'fleet snapshot failed: {error}')
+            self.stopped.wait(max(0, self.interval - (time.monotonic() - started_at)))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='performance-aggregator', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+
+if __name__ == '__main__':
+    from fleet import load_bots_config, load_bots
+
+    # python performance_aggregator.py, takes one snapshot of the fleet and prints the totals
+    aggregator = PerformanceAggregator(load_bots(load_bots_config()))
+    aggregator.poll()
+    print(json.dumps({
+        'fleet': aggregator.totals(),
+        'config': aggregator.totals('config'),
+        'strategy': aggregator.totals('strategy'),
+        'deltas': aggregator.deltas()
+    }, indent=2))
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import logging
+from collections import namedtuple
+from files import write_json
+
+checkpoint_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'checkpoints')
+
+# checkpointed stages are skipped on resume once done, the others always run
+Stage = namedtuple('Stage', ['name', 'run', 'checkpointed'])
+
+
+class Checkpoint:
+    def __init__(self, name, signature, folder=checkpoint_folder):
+        self.path = os.path.join(folder, f'{name}.json')
+        self.signature = signature
+        self.completed = []
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except (IOError, ValueError):
+            return
+
+        # progress made for a different config or strategy can not be resumed
+        if checkpoint.get('signature') == self.signature:
+            self.completed = checkpoint['completed']
+
+    def save(self):
+        write_json(self.path, {
+            'signature': self.signature,
+            'completed': self.completed,
+            'updated_at': time.time()
+        }, indent=2)
+
+    def is_complete(self, stage):
+        return stage in self.completed
+
+    def mark(self, stage):
+        self.completed.append(stage)
+        self.save()
+
+    def clear(self):
+        self.completed = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class UpdatePipeline:
+    def __init__(self, bot, stages, checkpoint):
+        self.bot = bot
+        self.stages = stages
+        self.checkpoint = checkpoint
+
+    def run(self):
+        for stage in self.stages:
+            if stage.checkpointed and self.checkpoint.is_complete(stage.name):
+                logging.debug(f'{self.bot.name} already completed {stage.name}, skipping')
+                continue
+
+            self.bot.set_stage(stage.name)
+            with self.bot.trace(stage.name):
+                stage.run()
+
+            if stage.checkpointed:
+                self.checkpoint.mark(stage.name)
+
+        # the update finished so the next run starts from the beginning
+        self.checkpoint.clear()
+        self.bot.set_stage('done')
@@ -0,0 +1,170 @@
+import json
+import time
+import numpy
+import logging
+import requests
+import threading
+
+
+class BinanceStreamTransport:
+    reconnect = True
+
+    def __init__(self, url='wss://stream.binance.com:9443/ws/!miniTicker@arr',
+                 snapshot_url='https://api.binance.com/api/v3/ticker/price', timeout=30):
+        self.url = url
+        self.snapshot_url = snapshot_url
+        self.timeout = timeout
+        self.connection = None
+
+    def snapshot(self):
+        # the stream only sends the markets that changed, so start from the price of every market
+        response = requests.get(self.snapshot_url, timeout=self.timeout)
+        response.raise_for_status()
+        return [(ticker['symbol'], float(ticker['price'])) for ticker in response.json()]
+
+    def messages(self):
+        import websocket
+
+        # the all market mini ticker stream pushes every changed price once a second
+        self.connection = websocket.create_connection(self.url, timeout=self.timeout)
+        try:
+            while True:
+                yield [(ticker['s'], float(ticker['c'])) for ticker in json.loads(self.connection.recv())]
+        finally:
+            self.connection.close()
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+
+class ReplayTransport:
+    reconnect = False
+
+    def __init__(self, path, interval=0.0, loop=False):
+        # replays a json lines file of recorded mini ticker messages for offline runs
+        self.path = path
+        self.interval = interval
+        self.loop = loop
+        self.closed = False
+
+    def messages(self):
+        while not self.closed:
+            with open(self.path) as replay_file:
+                for line in replay_file:
+                    if self.closed:
+                        return
+                    yield [(ticker['s'], float(ticker['c'])) for ticker in json.loads(line)]
+                    time.sleep(self.interval)
+
+            if not self.loop:
+                return
+
+    def snapshot(self):
+        # a recording is taken as the whole market
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+class PriceBook:
+    def __init__(self, capacity=2048):
+        self.prices = numpy.full(capacity, numpy.nan)
+        self.indexes = {}
+        self.updated_at = 0
+        self.seeded = False
+        self.lock = threading.Lock()
+
+    def update(self, tickers):
+        with self.lock:
+            for symbol, price in tickers:
+                index = self.indexes.get(symbol)
+                if index is None:
+                    index = len(self.indexes)
+                    self.indexes[symbol] = index
+
+                    # grow the table when a new market is listed
+                    if index >= len(self.prices):
+                        self.prices = numpy.concatenate([self.prices, numpy.full(len(self.prices), numpy.nan)])
+
+                self.prices[index] = price
+            self.updated_at = time.monotonic()
+
+    def get(self, symbol):
+        index = self.indexes.get(symbol)
+        if index is None:
+            return None
+        return float(self.prices[index])
+
+    def get_prices(self):
+        # the same shape as the prices from the rest ticker endpoint
+        with self.lock:
+            prices = self.prices[:len(self.indexes)].tolist()
+            return dict(zip(self.indexes.keys(), prices))
+
+    def get_symbols(self):
+        with self.lock:
+            return list(self.indexes.keys())
+
+    def age(self):
+        if not self.updated_at:
+            return float('inf')
+        return time.monotonic() - self.updated_at
+
+
+class PriceBookService:
+    def __init__(self, transport, price_book=None, reconnect_delay=5):
+        self.transport = transport
+        self.price_book = price_book or PriceBook()
+        self.reconnect_delay = reconnect_delay
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                # seed on every connect, the prices that changed while disconnected are not sent again
+                self.price_book.update(self.transport.snapshot())
+                self.price_book.seeded = True
+
+                for tickers in self.transport.messages():
+                    self.price_book.update(tickers)
+                    if self.stopped.is_set():
+                        return
+
+                # a replay that ran out is finished, it is not a dropped connection
+                if not self.transport.reconnect:
+                    self.stopped.set()
+                    return
+            except Exception as error:
+                logging.warning(f'price stream dropped, reconnecting: {error}')
+
+            self.stopped.wait(self.reconnect_delay)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='price-book', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.transport.close()
+
+
+price_book_service = None
+
+
+def start_price_book(transport=None):
+    # one stream feeds every bot and screener in the process
+    global price_book_service
+
+    if not price_book_service:
+        price_book_service = PriceBookService(transport or BinanceStreamTransport()).start()
+    return price_book_service.price_book
+
+
+def get_price_book():
+    if price_book_service:
+        return price_book_service.price_book
+    return None
@@ -0,0 +1,116 @@
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from multiprocessing.managers import BaseManager
+
+
+class TokenBucket:
+    def __init__(self, weight_per_minute=1200, safety_factor=0.8, burst=100):
+        # refill below the exchange limit and keep the burst small so no rolling minute can overshoot it
+        self.rate = weight_per_minute * safety_factor / 60
+        self.capacity = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, weight=1):
+        # take the weight now and return how long the caller has to wait before using it
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= weight
+
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.local = threading.local()
+
+    def acquire(self, weight=1):
+        wait = self.bucket.reserve(weight)
+        if wait > 0:
+            time.sleep(wait)
+
+    @contextmanager
+    def weighted(self, weight):
+        # set the weight of the exchange calls made on this thread inside the block
+        previous_weight = getattr(self.local, 'weight', None)
+        self.local.weight = weight
+        try:
+            yield
+        finally:
+            self.local.weight = previous_weight
+
+    def throttle(self, cost=None):
+        weight = getattr(self.local, 'weight', None) or cost or 1
+        self.acquire(weight)
+
+    def attach(self, exchange):
+        # replace the per instance throttle of a ccxt exchange with the shared bucket
+        exchange.enableRateLimit = True
+        exchange.throttle = self.throttle
+        return exchange
+
+
+class RateLimitBroker(BaseManager):
+    pass
+
+
+broker_buckets = {}
+broker_buckets_lock = threading.Lock()
+
+
+def get_broker_bucket(key, weight_per_minute=1200):
+    with broker_buckets_lock:
+        if key not in broker_buckets:
+            broker_buckets[key] = TokenBucket(weight_per_minute)
+        return broker_buckets[key]
+
+
+def serve_broker(host='127.0.0.1', port=50555, authkey=b'user_data'):
+    # share the buckets with other processes on this machine
+    RateLimitBroker.register('get_bucket', callable=get_broker_bucket)
+    broker = RateLimitBroker(address=(host, port), authkey=authkey)
+    logging.info(f'serving rate limits on {host}:{port}...')
+    broker.get_server().serve_forever()
+
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+broker = None
+
+
+def connect_broker(host='127.0.0.1', port=50555, authkey=b'user_data'):
+    global broker
+
+    RateLimitBroker.register('get_bucket')
+    broker = RateLimitBroker(address=(host, port), authkey=authkey)
+    broker.connect()
+    logging.debug(f'using the rate limit broker on {host}:{port}')
+
+
+def get_rate_limiter(api_key, weight_per_minute=1200):
+    # every bot and screener using the same key shares one limiter
+    key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    with rate_limiters_lock:
+        if key not in rate_limiters:
+            if broker:
+                bucket = broker.get_bucket(key, weight_per_minute)
+            else:
+                bucket = TokenBucket(weight_per_minute)
+            rate_limiters[key] = RateLimiter(bucket)
+
+        return rate_limiters[key]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    serve_broker()
@@ -0,0 +1,70 @@
+import time
+import socket
+import random
+import requests
+from collections import namedtuple
+
+ReadinessResult = namedtuple('ReadinessResult', ['ready', 'stage', 'attempts', 'elapsed', 'error'])
+
+
+class ReadinessProbe:
+    def __init__(self, host_name, ssh_port=22, api_port=8080, deadline=300, initial_delay=0.25, max_delay=8,
+                 connect_timeout=3):
+        self.host_name = host_name
+        self.ssh_port = ssh_port
+        self.api_port = api_port
+        self.deadline = deadline
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.connect_timeout = connect_timeout
+
+    def backoff(self, attempt):
+        # exponential backoff with full jitter so a fleet of bots does not poll in lock step
+        delay = min(self.max_delay, self.initial_delay * 2 ** attempt)
+        return random.uniform(self.initial_delay, delay)
+
+    def poll(self, stage, check, deadline_at):
+        started_at = time.monotonic()
+        attempts = 0
+        error = None
+
+        while True:
+            attempts += 1
+            try:
+                if check():
+                    return ReadinessResult(True, stage, attempts, time.monotonic() - started_at, None)
+            except Exception as exception:
+                error = str(exception)
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                return ReadinessResult(False, stage, attempts, time.monotonic() - started_at, error)
+
+            time.sleep(min(self.backoff(attempts - 1), remaining))
+
+    def is_port_open(self, port):
+        try:
+            with socket.create_connection((self.host_name, port), timeout=self.connect_timeout):
+                return True
+        except OSError:
+            return False
+
+    def is_api_up(self):
+        response = requests.get(
+            f'http://{self.host_name}:{self.api_port}/api/v1/ping',
+            timeout=self.connect_timeout
+        )
+        return response.status_code == 200
+
+    def wait_for_shutdown(self, timeout=60):
+        # after a reboot command the old sshd can still answer for a moment, so wait for it to go away
+        deadline_at = time.monotonic() + timeout
+        return self.poll('ssh_down', lambda: not self.is_port_open(self.ssh_port), deadline_at)
+
+    def wait_for_ssh(self, deadline_at=None):
+        deadline_at = deadline_at or time.monotonic() + self.deadline
+        return self.poll('ssh', lambda: self.is_port_open(self.ssh_port), deadline_at)
+
+    def wait_for_api(self, deadline_at=None):
+        deadline_at = deadline_at or time.monotonic() + self.deadline
+        return self.poll('api', self.is_api_up, deadline_at)
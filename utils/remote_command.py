@@ -0,0 +1,72 @@
+import time
+import select
+
+
+class CommandTimeout(Exception):
+    pass
+
+
+class RemoteCommand:
+    def __init__(self, channel, command, timeout=None, max_line_bytes=65536, chunk_size=32768):
+        self.channel = channel
+        self.command = command
+        self.timeout = timeout
+        self.max_line_bytes = max_line_bytes
+        self.chunk_size = chunk_size
+        self.partial_lines = {'stdout': b'', 'stderr': b''}
+        self.channel.exec_command(command)
+        self.started_at = time.monotonic()
+
+    def split_lines(self, stream, data):
+        lines = (self.partial_lines[stream] + data).split(b'\n')
+        partial_line = lines.pop()
+
+        # hand over very long lines in pieces so one line can not grow without bound
+        while len(partial_line) > self.max_line_bytes:
+            lines.append(partial_line[:self.max_line_bytes])
+            partial_line = partial_line[self.max_line_bytes:]
+
+        self.partial_lines[stream] = partial_line
+        return [(stream, line.decode('utf-8', errors='replace')) for line in lines]
+
+    def read_ready(self):
+        lines = []
+        if self.channel.recv_ready():
+            lines.extend(self.split_lines('stdout', self.channel.recv(self.chunk_size)))
+        if self.channel.recv_stderr_ready():
+            lines.extend(self.split_lines('stderr', self.channel.recv_stderr(self.chunk_size)))
+        return lines
+
+    def __iter__(self):
+        # yield stdout and stderr lines as they arrive, only the unfinished line of each stream is held
+        while True:
+            if self.timeout and time.monotonic() - self.started_at > self.timeout:
+                self.cancel()
+                raise CommandTimeout(f'{self.command!r} did not finish within {self.timeout}s')
+
+            lines = self.read_ready()
+            if lines:
+                yield from lines
+                continue
+
+            # everything has been read once the command exited and both buffers are empty
+            if self.channel.exit_status_ready() or self.channel.closed:
+                lines = self.read_ready()
+                if not lines:
+                    break
+                yield from lines
+                continue
+
+            select.select([self.channel], [], [], 0.1)
+
+        for stream, partial_line in self.partial_lines.items():
+            if partial_line:
+                yield stream, partial_line.decode('utf-8', errors='replace')
+        self.partial_lines = {'stdout': b'', 'stderr': b''}
+
+    @property
+    def exit_status(self):
+        return self.channel.recv_exit_status()
+
+    def cancel(self):
+        self.channel.close()
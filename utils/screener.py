@@ -1,21 +1,16 @@
-import ccxt
 import os
 import json
+from exchange import create_exchange
+from price_book import get_price_book
+from market_index import get_market_index
 from datetime import datetime
 from datetime import timedelta
 
 
 class Screener:
     def __init__(self, bot_data, stake_currency, config, strategy, days, candle_time):
-
-
-        exchange_class = getattr(ccxt, 'binance')
-        self.exchange = exchange_class({
-            'apiKey': bot_data['exchange_key'],
-            'secret': bot_data['exchange_secret'],
-            'timeout': 30000,
-            'enableRateLimit': True,
-        })
+        # share the rate limiter with any bot using the same exchange key
+        self.exchange = create_exchange(bot_data['exchange_key'], bot_data['exchange_secret'])
 
         self.stake_currency = stake_currency
         self.config = config
@@ -32,9 +27,16 @@ class Screener:
 
     def get_pairs(self):
         pairs = []
-        response = self.exchange.fetchTickers()
 
-        for pair in response.keys():
+        # use the markets in the streamed price book when it is running instead of downloading every ticker
+        price_book = get_price_book()
+        if price_book and price_book.seeded:
+            symbols = get_market_index(self.exchange).get_symbols()
+            tickers = [symbols[market_id] for market_id in price_book.get_symbols() if market_id in symbols]
+        else:
+            tickers = self.exchange.fetchTickers().keys()
+
+        for pair in tickers:
             if self.stake_currency in pair:
                 pairs.append(pair)
 
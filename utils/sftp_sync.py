@@ -0,0 +1,93 @@
+import io
+import json
+import hashlib
+import logging
+import posixpath
+import paramiko
+
+
+default_manifest_path = 'freqtrade/.bot_manifest.json'
+
+
+class SFTPSync:
+    def __init__(self, transport, manifest_path=default_manifest_path):
+        # sftp paths are relative to the home folder of the remote user
+        self.sftp = paramiko.SFTPClient.from_transport(transport)
+        self.manifest_path = manifest_path
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        try:
+            with self.sftp.open(self.manifest_path, 'r') as manifest_file:
+                return json.loads(manifest_file.read())
+        except (IOError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        self.write(self.manifest_path, json.dumps(self.manifest, indent=2).encode('utf-8'))
+
+    def get_started(self):
+        return self.manifest.get('_started')
+
+    def set_started(self, started):
+        # the files the running bot was started with, a reload only re-reads those
+        self.manifest['_started'] = started
+        self.save_manifest()
+
+    def read(self, remote_path):
+        try:
+            with self.sftp.open(remote_path, 'rb') as remote_file:
+                return remote_file.read()
+        except IOError:
+            return None
+
+    def is_unchanged(self, remote_path, digest, size):
+        entry = self.manifest.get(remote_path)
+        if not entry or entry['sha256'] != digest:
+            return False
+
+        # make sure the file was not removed or rewritten by anything else since the push
+        try:
+            stat = self.sftp.stat(remote_path)
+        except IOError:
+            return False
+        return stat.st_size == size and stat.st_mtime == entry.get('mtime')
+
+    def write(self, remote_path, data):
+        # stream into a temporary file then swap it in so a dropped link never leaves half a file
+        temporary_path = f'{remote_path}.part'
+        self.sftp.putfo(io.BytesIO(data), temporary_path, file_size=len(data))
+        self.sftp.posix_rename(temporary_path, remote_path)
+
+    def push(self, data, remote_path):
+        digest = hashlib.sha256(data).hexdigest()
+
+        if self.is_unchanged(remote_path, digest, len(data)):
+            logging.debug(f'{remote_path} is unchanged, skipping upload')
+            return False
+
+        logging.debug(f'uploading {len(data)} bytes to {remote_path}...')
+        remote_folder = posixpath.dirname(remote_path)
+        if remote_folder:
+            self.make_folders(remote_folder)
+
+        self.write(remote_path, data)
+        self.manifest[remote_path] = {
+            'sha256': digest,
+            'size': len(data),
+            'mtime': self.sftp.stat(remote_path).st_mtime
+        }
+        self.save_manifest()
+        return True
+
+    def make_folders(self, remote_folder):
+        path = ''
+        for folder in remote_folder.split('/'):
+            path = posixpath.join(path, folder)
+            try:
+                self.sftp.stat(path)
+            except IOError:
+                self.sftp.mkdir(path)
+
+    def close(self):
+        self.sftp.close()
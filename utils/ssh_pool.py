@@ -0,0 +1,85 @@
+import socket
+import logging
+import threading
+import paramiko
+
+
+class SSHConnectionPool:
+    def __init__(self, port=22, timeout=10, keepalive_interval=15):
+        self.port = port
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self.transports = {}
+        self.detached_channels = {}
+        self.host_locks = {}
+        self.lock = threading.Lock()
+
+    def get_host_lock(self, key):
+        with self.lock:
+            if key not in self.host_locks:
+                self.host_locks[key] = threading.Lock()
+            return self.host_locks[key]
+
+    def get_transport(self, host_name, user_name, private_key):
+        key = (host_name, user_name)
+
+        with self.get_host_lock(key):
+            transport = self.transports.get(key)
+
+            # reuse the live transport if the link is still up
+            if transport and transport.is_active() and transport.is_authenticated():
+                return transport
+
+            # the host was rebooted or the link dropped, so throw the old transport away
+            if transport:
+                transport.close()
+
+            logging.debug(f'opening ssh transport to {host_name}...')
+            sock = socket.create_connection((host_name, self.port), timeout=self.timeout)
+            transport = paramiko.Transport(sock)
+            try:
+                transport.start_client(timeout=self.timeout)
+                transport.auth_publickey(user_name, private_key)
+            except Exception:
+                transport.close()
+                raise
+
+            # keep the link alive between commands
+            transport.set_keepalive(self.keepalive_interval)
+
+            self.transports[key] = transport
+            return transport
+
+    def open_channel(self, host_name, user_name, private_key):
+        transport = self.get_transport(host_name, user_name, private_key)
+        try:
+            return transport.open_session(timeout=self.timeout)
+
+        # the link died since the last command, so reconnect once and try again
+        except (paramiko.SSHException, EOFError, socket.error):
+            self.close(host_name, user_name)
+            transport = self.get_transport(host_name, user_name, private_key)
+            return transport.open_session(timeout=self.timeout)
+
+    def keep_channel(self, host_name, user_name, channel):
+        # hold a reference to detached channels so they are not closed when garbage collected
+        with self.lock:
+            self.detached_channels.setdefault((host_name, user_name), []).append(channel)
+
+    def close(self, host_name, user_name):
+        key = (host_name, user_name)
+
+        with self.lock:
+            transport = self.transports.pop(key, None)
+            self.detached_channels.pop(key, None)
+
+        if transport:
+            transport.close()
+
+    def close_all(self):
+        for host_name, user_name in list(self.transports.keys()):
+            self.close(host_name, user_name)
+
+
+# a single pool shared by every bot so each host keeps one live transport
+ssh_pool = SSHConnectionPool()
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import math
+import threading
+from contextlib import contextmanager
+from collections import deque, defaultdict
+from files import write_atomic
+
+trace_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'traces')
+
+
+class Span:
+    def __init__(self, name, kind, bot, host, parent=None):
+        self.name = name
+        self.kind = kind
+        self.bot = bot
+        self.host = host
+        self.parent = parent
+        self.started_at = time.time()
+        self.duration = None
+        self.bytes = 0
+        self.retries = 0
+        self.status = 'ok'
+        self.error = None
+
+    def add_bytes(self, count):
+        self.bytes += count
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'bot': self.bot,
+            'host': self.host,
+            'parent': self.parent,
+            'started_at': self.started_at,
+            'duration': self.duration,
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'status': self.status,
+            'error': self.error
+        }
+
+
+class Tracer:
+    def __init__(self, max_spans=100000):
+        # the oldest spans are dropped when nothing exports them, the totals keep counting
+        self.spans = deque(maxlen=max_spans)
+        self.totals = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'bytes': 0, 'retries': 0, 'errors': 0})
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def span(self, name, kind='stage', bot=None, host=None):
+        # remote calls made inside a stage are recorded with the stage as their parent
+        stack = self.local.__dict__.setdefault('stack', [])
+        span = Span(name, kind, bot, host, stack[-1].name if stack else None)
+        stack.append(span)
+        started = time.monotonic()
+
+        try:
+            yield span
+        except Exception as error:
+            span.status = 'error'
+            span.error = str(error)
+            raise
+        finally:
+            span.duration = time.monotonic() - started
+            stack.pop()
+            with self.lock:
+                self.spans.append(span)
+                total = self.totals[(span.kind, span.name, span.host or '')]
+                total['count'] += 1
+                total['seconds'] += span.duration
+                total['bytes'] += span.bytes
+                total['retries'] += span.retries
+                total['errors'] += span.status == 'error'
+
+    def export_jsonl(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # take the spans out so the next export only appends the new ones
+        with self.lock:
+            spans, self.spans = self.spans, deque(maxlen=self.spans.maxlen)
+
+        with open(path, 'a') as jsonl_file:
+            for span in spans:
+                jsonl_file.write(json.dumps(span.to_dict()) + '\n')
+
+    def export_prometheus(self, path):
+        with self.lock:
+            totals = {key: dict(total) for key, total in self.totals.items()}
+
+        metrics = [
+            ('bot_update_span_seconds_total', 'seconds', 'Total time spent in each span.'),
+            ('bot_update_span_count_total', 'count', 'Number of times each span ran.'),
+            ('bot_update_span_bytes_total', 'bytes', 'Bytes moved by each span.'),
+            ('bot_update_span_retries_total', 'retries', 'Retries made by each span.'),
+            ('bot_update_span_errors_total', 'errors', 'Spans that ended with an error.')
+        ]
+
+        lines = []
+        for metric, field, description in metrics:
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            for (kind, name, host), total in sorted(totals.items()):
+                lines.append(f'{metric}{{kind="{kind}",name="{name}",host="{host}"}} {total[field]}')
+
+        # a scraper never reads half a file
+        write_atomic(path, '\n'.join(lines) + '\n')
+
+    def export(self, folder=trace_folder):
+        self.export_jsonl(os.path.join(folder, 'spans.jsonl'))
+        self.export_prometheus(os.path.join(folder, 'metrics.prom'))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(path, kind='stage'):
+    durations = defaultdict(list)
+    hosts = defaultdict(list)
+
+    with open(path) as jsonl_file:
+        for line in jsonl_file:
+            span = json.loads(line)
+            if span['kind'] == kind:
+                durations[span['name']].append(span['duration'])
+                hosts[span['name']].append((span['duration'], span['host']))
+
+    # show the p50 and p95 of each stage and the host where it was slowest
+    rows = [f'{kind:<36}{"count":>8}{"p50":>10}{"p95":>10}  slowest host']
+    for name, values in sorted(durations.items(), key=lambda item: -percentile(item[1], 0.95)):
+        slowest_duration, slowest_host = max(hosts[name], key=lambda item: item[0])
+        rows.append(
+            f'{name:<36}{len(values):>8}{percentile(values, 0.5):>10.2f}{percentile(values, 0.95):>10.2f}'
+            f'  {slowest_host} ({slowest_duration:.2f}s)'
+        )
+
+    return '\n'.join(rows)
+
+
+tracer = Tracer()
+
+
+if __name__ == '__main__':
+    # python tracing.py summary [spans.jsonl] [kind]
+    if len(sys.argv) < 2 or sys.argv[1] != 'summary':
+        print('usage: tracing.py summary [spans.jsonl] [stage|ssh|sftp|api]')
+        sys.exit(1)
+
+    spans_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(trace_folder, 'spans.jsonl')
+    print(summarize(spans_path, sys.argv[3] if len(sys.argv) > 3 else 'stage'))
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import shlex
+import logging
+import threading
+import pandas
+import pyarrow
+import pyarrow.parquet
+from files import write_json
+
+trade_store_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'trades')
+
+# every batch is written with the same types, whatever pandas guesses from the rows it holds
+trade_schema = pyarrow.schema([
+    ('id', pyarrow.int64()),
+    ('exchange', pyarrow.string()),
+    ('pair', pyarrow.string()),
+    ('is_open', pyarrow.int64()),
+    ('fee_open', pyarrow.float64()),
+    ('fee_open_cost', pyarrow.float64()),
+    ('fee_open_currency', pyarrow.string()),
+    ('fee_close', pyarrow.float64()),
+    ('fee_close_cost', pyarrow.float64()),
+    ('fee_close_currency', pyarrow.string()),
+    ('open_rate', pyarrow.float64()),
+    ('open_rate_requested', pyarrow.float64()),
+    ('open_trade_price', pyarrow.float64()),
+    ('close_rate', pyarrow.float64()),
+    ('close_rate_requested', pyarrow.float64()),
+    ('close_profit', pyarrow.float64()),
+    ('close_profit_abs', pyarrow.float64()),
+    ('stake_amount', pyarrow.float64()),
+    ('amount', pyarrow.float64()),
+    ('open_date', pyarrow.string()),
+    ('close_date', pyarrow.string()),
+    ('open_order_id', pyarrow.string()),
+    ('stop_loss', pyarrow.float64()),
+    ('stop_loss_pct', pyarrow.float64()),
+    ('initial_stop_loss', pyarrow.float64()),
+    ('initial_stop_loss_pct', pyarrow.float64()),
+    ('stoploss_order_id', pyarrow.string()),
+    ('stoploss_last_update', pyarrow.string()),
+    ('max_rate', pyarrow.float64()),
+    ('min_rate', pyarrow.float64()),
+    ('sell_reason', pyarrow.string()),
+    ('sell_order_status', pyarrow.string()),
+    ('strategy', pyarrow.string()),
+    ('timeframe', pyarrow.int64()),
+    ('dry_run', pyarrow.bool_()),
+    ('bot', pyarrow.string()),
+    ('date', pyarrow.string())
+])
+
+# run with the python on the bot host so only the new closed trades leave the machine
+harvest_script = '''
+import os, sys, json, sqlite3
+if not os.path.exists(sys.argv[1]):
+    sys.exit(0)
+connection = sqlite3.connect(sys.argv[1])
+connection.row_factory = sqlite3.Row
+query = 'SELECT * FROM trades WHERE is_open = 0 AND close_date > ? ORDER BY close_date'
+for row in connection.execute(query, (sys.argv[2],)):
+    print(json.dumps(dict(row), default=str))
+'''
+
+
+class TradeStore:
+    def __init__(self, folder=trade_store_folder):
+        self.folder = folder
+        self.state_path = os.path.join(folder, '_state.json')
+        self.lock = threading.Lock()
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as state_file:
+                return json.load(state_file)
+        except (IOError, ValueError):
+            return {}
+
+    def get_watermark(self, bot_name, database):
+        # the close date of the newest trade already in the store, it survives database resets
+        return self.load_state().get(f'{bot_name}/{database}', '')
+
+    def to_table(self, bot_name, dry_run, trades):
+        frame = pandas.DataFrame(trades)
+        for field in trade_schema.names:
+            if field not in frame:
+                frame[field] = None
+
+        frame['bot'] = bot_name
+        frame['dry_run'] = dry_run
+        frame['date'] = frame['close_date'].str.slice(0, 10)
+
+        # older freqtrade versions only store the profit ratio
+        frame['close_profit_abs'] = frame['close_profit_abs'].fillna(frame['close_profit'] * frame['stake_amount'])
+
+        # columns from newer freqtrade versions are left out so every file keeps the same schema
+        return pyarrow.Table.from_pandas(frame[trade_schema.names], schema=trade_schema, preserve_index=False)
+
+    def append(self, bot_name, database, dry_run, trades):
+        if not trades:
+            return 0
+
+        table = self.to_table(bot_name, dry_run, trades)
+
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            pyarrow.parquet.write_to_dataset(table, self.folder, partition_cols=['bot', 'date'])
+
+            # only move the watermark once the rows are safely written
+            state = self.load_state()
+            state[f'{bot_name}/{database}'] = max(trade['close_date'] for trade in trades)
+            write_json(self.state_path, state, indent=2)
+
+        return table.num_rows
+
+    def load(self, columns=None, filters=None):
+        if not os.path.exists(self.folder):
+            return pandas.DataFrame()
+        return pandas.read_parquet(self.folder, columns=columns, filters=filters)
+
+    def profit_per_strategy_per_day(self, dry_run=False):
+        # simulated and real profit are never summed together, dry_run is not a partition so filter in pandas
+        trades = self.load(columns=['strategy', 'date', 'close_profit_abs', 'dry_run'])
+        if trades.empty:
+            return trades
+        trades = trades[trades['dry_run'] == dry_run]
+        return trades.groupby(['strategy', 'date'])['close_profit_abs'].agg(['sum', 'count'])
+
+
+class TradeHarvester:
+    def __init__(self, store=None, timeout=300):
+        self.store = store or TradeStore()
+        self.timeout = timeout
+
+    def harvest(self, bot):
+        database = 'tradesv3.dryrun.sqlite' if bot.dry_run else 'tradesv3.sqlite'
+        watermark = self.store.get_watermark(bot.name, database)
+
+        command = ' '.join([
+            'cd freqtrade/ &&',
+            'python3 -c', shlex.quote(harvest_script),
+            shlex.quote(database),
+            shlex.quote(watermark)
+        ])
+
+        # read the new trades line by line as they are streamed back
+        trades = []
+        errors = []
+        remote_command = bot.stream_command(command, timeout=self.timeout)
+        for stream, line in remote_command:
+            if stream == 'stdout' and line:
+                trades.append(json.loads(line))
+            elif line:
+                errors.append(line)
+
+        if remote_command.exit_status != 0:
+            raise RuntimeError(f'{bot.name} trade harvest failed: {" ".join(errors)}')
+
+        count = self.store.append(bot.name, database, bot.dry_run, trades)
+        logging.debug(f'{bot.name} harvested {count} new trades from {database}')
+        return count
+
+
+if __name__ == '__main__':
+    # python trade_harvester.py [folder] [--dry-run], prints the profit of each strategy per day across the fleet
+    arguments = [argument for argument in sys.argv[1:] if argument != '--dry-run']
+    pandas.set_option('display.max_rows', None)
+    print(TradeStore(arguments[0] if arguments else trade_store_folder).profit_per_strategy_per_day(
+        dry_run='--dry-run' in sys.argv
+    ))
@@ -0,0 +1,201 @@
+import sys
+import time
+import shlex
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+CommandResult = namedtuple('CommandResult', ['name', 'exit_status', 'stdout', 'stderr', 'error'])
+
+
+class SSHCommandTransport:
+    name = 'ssh'
+
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+
+    def run(self, bot, command):
+        with bot.trace('bash_command', 'ssh') as span:
+            # run the command on a new channel of the pooled transport
+            channel = bot.open_connection()
+            channel.exec_command(command)
+
+            terminal_output = channel.makefile('rb').read()
+            error = channel.makefile_stderr('rb').read()
+            exit_status = channel.recv_exit_status()
+            span.add_bytes(len(command) + len(terminal_output) + len(error))
+
+            channel.close()
+
+        return CommandResult(bot.name, exit_status, terminal_output.decode('utf-8'), error.decode('utf-8'), None)
+
+    def run_detached(self, bot, command):
+        with bot.trace('run_detached_command', 'ssh') as span:
+            # run the commands in a separate detached channel
+            channel = bot.open_connection()
+            channel.exec_command(command)
+            span.add_bytes(len(command))
+            bot.ssh_pool.keep_channel(bot.host_name, bot.user_name, channel)
+
+    def run_safely(self, bot, command):
+        try:
+            return self.run(bot, command)
+        except Exception as error:
+            return CommandResult(bot.name, None, '', '', str(error))
+
+    def run_many(self, bots, command):
+        # every host needs its own channel, so run them side by side
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(bots) or 1)) as executor:
+            return list(executor.map(lambda bot: self.run_safely(bot, command), bots))
+
+
+class SSMCommandTransport:
+    name = 'ssm'
+    pending_statuses = ['Pending', 'InProgress', 'Delayed']
+
+    def __init__(self, client=None, document_name='AWS-RunShellScript', poll_interval=2, timeout=600,
+                 batch_size=50):
+        self.client = client
+        self.document_name = document_name
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+
+    def get_client(self):
+        with self.lock:
+            if not self.client:
+                import boto3
+                self.client = boto3.client('ssm')
+            return self.client
+
+    def wrap(self, user_name, command):
+        # the agent runs as root, so run the command from the bot user's home folder as that user
+        return f'cd /home/{user_name} && sudo -H -u {user_name} bash -c {shlex.quote(command)}'
+
+    def send(self, bots, command):
+        groups = {}
+        for bot in bots:
+            groups.setdefault(bot.user_name, []).append(bot)
+
+        # one api call reaches up to a batch of instances at once
+        sent = []
+        for user_name, user_bots in groups.items():
+            for index in range(0, len(user_bots), self.batch_size):
+                batch = user_bots[index:index + self.batch_size]
+                with batch[0].trace('send_command', 'ssm'):
+                    response = self.get_client().send_command(
+                        InstanceIds=[bot.instance_id for bot in batch],
+                        DocumentName=self.document_name,
+                        Parameters={'commands': [self.wrap(user_name, command)]},
+                        TimeoutSeconds=60
+                    )
+                sent.append((response['Command']['CommandId'], batch))
+
+        return sent
+
+    def list_invocations(self, command_id):
+        invocations = []
+        arguments = {'CommandId': command_id, 'Details': True}
+        while True:
+            response = self.get_client().list_command_invocations(**arguments)
+            invocations.extend(response['CommandInvocations'])
+            if not response.get('NextToken'):
+                return invocations
+            arguments['NextToken'] = response['NextToken']
+
+    def to_result(self, bot, invocation):
+        if not invocation:
+            return CommandResult(bot.name, None, '', '', 'no invocation was found')
+
+        plugins = invocation.get('CommandPlugins') or [{}]
+        exit_status = plugins[0].get('ResponseCode', -1)
+        output = plugins[0].get('Output', '')
+
+        # ssm merges both streams, so treat the output of a failed command like ssh treats stderr
+        if invocation['Status'] == 'Success':
+            return CommandResult(bot.name, exit_status, output, '', None)
+        if invocation['Status'] == 'Failed' and exit_status != -1:
+            return CommandResult(bot.name, exit_status, '', output, None)
+        return CommandResult(bot.name, exit_status, '', output, invocation['Status'])
+
+    def collect(self, sent):
+        started_at = time.monotonic()
+        results = {}
+
+        # poll every instance of a command with one call until they have all finished
+        while sent and time.monotonic() - started_at < self.timeout:
+            still_running = []
+            for command_id, batch in sent:
+                invocations = {invocation['InstanceId']: invocation for invocation in self.list_invocations(command_id)}
+                for bot in batch:
+                    invocation = invocations.get(bot.instance_id)
+                    results[bot.name] = self.to_result(bot, invocation)
+
+                if any(invocations.get(bot.instance_id, {}).get('Status', 'Pending') in self.pending_statuses
+                       for bot in batch):
+                    still_running.append((command_id, batch))
+
+            sent = still_running
+            if sent:
+                time.sleep(self.poll_interval)
+
+        for _, batch in sent:
+            for bot in batch:
+                results[bot.name] = results[bot.name]._replace(error='timed out waiting for the command')
+
+        return results
+
+    def run_many(self, bots, command):
+        results = self.collect(self.send(bots, command))
+        return [results[bot.name] for bot in bots]
+
+    def run(self, bot, command):
+        return self.run_many([bot], command)[0]
+
+    def run_detached(self, bot, command):
+        # let the shell exit straight away so the agent does not wait on the command
+        self.send([bot], f'nohup bash -c {shlex.quote(command)} > /dev/null 2>&1 &')
+
+
+command_transports = {}
+command_transports_lock = threading.Lock()
+
+
+def get_command_transport(name='ssh'):
+    # the transports are shared by every bot so the ssm calls can be batched
+    with command_transports_lock:
+        if name not in command_transports:
+            command_transports[name] = {'ssh': SSHCommandTransport, 'ssm': SSMCommandTransport}[name]()
+        return command_transports[name]
+
+
+def run_fleet_command(bots, command):
+    groups = {}
+    for bot in bots:
+        groups.setdefault(bot.command_transport, []).append(bot)
+
+    # each transport gets all of its bots at once, so ssm bots cost one call per batch
+    results = {}
+    for command_transport, transport_bots in groups.items():
+        for result in command_transport.run_many(transport_bots, command):
+            results[result.name] = result
+
+    return [results[bot.name] for bot in bots]
+
+
+if __name__ == '__main__':
+    from fleet import load_bots_config, load_bots
+
+    # python transport.py "command" [bot names]
+    if len(sys.argv) < 2:
+        print('usage: transport.py "command" [bot names]')
+        sys.exit(1)
+
+    fleet = load_bots(load_bots_config(), sys.argv[2:])
+
+    logging.getLogger().setLevel(logging.INFO)
+    for command_result in run_fleet_command(fleet, sys.argv[1]):
+        print(f'[{command_result.name}] exit {command_result.exit_status} {command_result.error or ""}')
+        print(command_result.stdout + command_result.stderr)
@@ -0,0 +1,81 @@
+import numpy
+from collections import deque
+
+
+class ValuationEngine:
+    def __init__(self, prices, symbols, extra_prices=None):
+        # prices are keyed by exchange id like BTCUSDT and symbols map those ids to BTC/USDT
+        self.edges = {}
+        self.assets = []
+        self.asset_indexes = {}
+        self.rates = {}
+
+        pairs = {symbols[market_id]: price for market_id, price in prices.items() if market_id in symbols}
+        pairs.update(extra_prices or {})
+
+        for symbol, price in pairs.items():
+            if not price:
+                continue
+            base, quote = symbol.split('/')
+            self.add_edge(base, quote, price)
+            self.add_edge(quote, base, 1 / price)
+
+    def add_asset(self, asset):
+        if asset not in self.asset_indexes:
+            self.asset_indexes[asset] = len(self.assets)
+            self.assets.append(asset)
+            self.edges[asset] = {}
+
+    def add_edge(self, source, target, rate):
+        self.add_asset(source)
+        self.add_asset(target)
+        self.edges[source][target] = rate
+
+    def get_rates(self, currency):
+        # walk out from the currency so every asset is priced through its shortest route, like ALT to BTC to USDT to USD
+        if currency in self.rates:
+            return self.rates[currency]
+
+        rates = numpy.full(len(self.assets), numpy.nan)
+        if currency in self.asset_indexes:
+            rates[self.asset_indexes[currency]] = 1.0
+            queue = deque([currency])
+
+            while queue:
+                asset = queue.popleft()
+                asset_rate = rates[self.asset_indexes[asset]]
+
+                # an asset that trades against this one is worth its price in this asset
+                for neighbour, rate in self.edges[asset].items():
+                    index = self.asset_indexes[neighbour]
+                    if numpy.isnan(rates[index]):
+                        rates[index] = asset_rate / rate
+                        queue.append(neighbour)
+
+        self.rates[currency] = rates
+        return rates
+
+    def to_vector(self, balances):
+        amounts = numpy.zeros(len(self.assets))
+        for asset, amount in balances.items():
+            index = self.asset_indexes.get(asset)
+            if index is not None:
+                amounts[index] = amount
+
+        return amounts
+
+    def value(self, balances, currency):
+        return float(self.value_accounts([balances], currency)[0])
+
+    def value_accounts(self, accounts, currency):
+        # value every account at once as one matrix product, assets with no route count as zero
+        rates = numpy.nan_to_num(self.get_rates(currency))
+        amounts = numpy.array([self.to_vector(balances) for balances in accounts]).reshape(len(accounts), -1)
+        return amounts @ rates
+
+    def get_unpriced_assets(self, balances, currency):
+        rates = self.get_rates(currency)
+        return [
+            asset for asset, amount in balances.items()
+            if amount > 0 and (asset not in self.asset_indexes or numpy.isnan(rates[self.asset_indexes[asset]]))
+        ]